@@ -1,5 +1,15 @@
 """Django REST API"""
 from django.conf.urls import url, include
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseBadRequest, \
+        HttpResponseNotAllowed, Http404, QueryDict
+from django.http.cookie import SimpleCookie
+import copy
+from .jsoncodec import get_default_codec
+
+class BatchRollback(Exception):
+    """Raised to roll back the transaction of a failed batch."""
 
 class RESTAPI(object):
     """Dispatcher object for RESTView's."""
@@ -7,6 +17,13 @@ class RESTAPI(object):
     view_by_model = {}
     name_by_model = {}
     urls = []
+    # Lookups resolved along the MRO of a model, cleared by ```register```.
+    resolved_views = {}
+    resolved_names = {}
+    # One reusable instance of each registered view class.
+    view_instances = {}
+    # Codec of request and response bodies, unless a view sets its own.
+    json_codec = get_default_codec()
 
     @staticmethod
     def register(Model, View, name=None):
@@ -15,29 +32,155 @@ class RESTAPI(object):
             name = Model._meta.verbose_name_plural.lower().replace(' ','')
         RESTAPI.view_by_model[Model] = View
         RESTAPI.name_by_model[Model] = name
+        RESTAPI.resolved_views.clear()
+        RESTAPI.resolved_names.clear()
         RESTAPI.urls.append(url(r'^%s' % (name,), include(View.urls(),
             namespace='api_%s' % (name,))))
 
+    @staticmethod
+    def resolve(Model, registry, resolved):
+        """Return the value registered for ```Model``` or the closest class
+        in its MRO, memoized in ```resolved```."""
+        try:
+            return resolved[Model]
+        except KeyError:
+            pass
+        value = None
+        for Base in Model.__mro__:
+            if Base in registry:
+                value = registry[Base]
+                break
+        resolved[Model] = value
+        return value
+
     @staticmethod
     def get_view_by_model(Model):
         """Get the view class that is registered for ```Model```."""
-        if Model in RESTAPI.view_by_model:
-            return RESTAPI.view_by_model[Model]
-        else:
-            for Base in Model.__bases__:
-                view = RESTAPI.get_view_by_model(Base)
-                if view is not None:
-                    return view
-        return None
+        return RESTAPI.resolve(Model, RESTAPI.view_by_model,
+                RESTAPI.resolved_views)
+
+    @staticmethod
+    def get_view_instance_by_model(Model):
+        """Get a shared instance of the view class registered for
+        ```Model```."""
+        View = RESTAPI.get_view_by_model(Model)
+        if View is None:
+            return None
+        try:
+            return RESTAPI.view_instances[View]
+        except KeyError:
+            view = RESTAPI.view_instances[View] = View()
+            return view
 
     @staticmethod
     def get_name_by_model(Model):
         """Get the name that is registered for ```Model```."""
-        if Model in RESTAPI.name_by_model:
-            return RESTAPI.name_by_model[Model]
+        return RESTAPI.resolve(Model, RESTAPI.name_by_model,
+                RESTAPI.resolved_names)
+
+    @staticmethod
+    def batch(request):
+        """Handle a batch of API requests in a single HTTP request.
+
+        The payload is a list of requests, or a dictionary with that list in
+        ```requests``` and ```atomic``` set to run all requests in one
+        transaction, which is rolled back when one of them fails. A request
+        is a dictionary with a ```method```, a ```path``` relative to the API
+        (e.g. ```users/5/groups/?limit=10```) and an optional ```body```.
+        Return the list of the ```status``` and ```body``` of every response.
+        """
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(['POST'])
+        try:
+            payload = RESTAPI.json_codec.decode(request.body)
+        except ValueError:
+            return HttpResponseBadRequest()
+
+        atomic = False
+        if isinstance(payload, dict):
+            atomic = bool(payload.get('atomic'))
+            payload = payload.get('requests')
+        if not isinstance(payload, list):
+            return HttpResponseBadRequest()
+
+        if atomic:
+            try:
+                with transaction.atomic():
+                    results = RESTAPI.run_batch(request, payload)
+                    if any(result['status'] >= 400 for result in results):
+                        raise BatchRollback(results)
+            except BatchRollback as e:
+                results = e.args[0]
         else:
-            for Base in Model.__bases__:
-                view = RESTAPI.get_name_by_model(Base)
-                if view is not None:
-                    return view
-        return None
+            results = RESTAPI.run_batch(request, payload)
+        response = HttpResponse(RESTAPI.json_codec.encode(results),
+                content_type='application/json')
+        response.cookies.update(request.restapi_cookies)
+        return response
+
+    @staticmethod
+    def run_batch(request, entries):
+        """Return the results of dispatching ```entries``` in order.
+
+        The requests are dispatched in-process to the registered views.
+        They share the user, the session and the identity map of
+        ```request```. After a successful write the requests read from the
+        default database, and the cookies that the responses set are kept
+        for the response to the batch.
+        """
+        from django.core.urlresolvers import RegexURLResolver
+        resolver = RegexURLResolver(r'^/', RESTAPI.urls)
+        root = request.path[:request.path.rfind('batch')]
+        if not hasattr(request, 'restapi_identity_map'):
+            request.restapi_identity_map = {}
+        request.restapi_cookies = SimpleCookie()
+        return [RESTAPI.dispatch(request, resolver, root, entry)
+                for entry in entries]
+
+    @staticmethod
+    def dispatch(request, resolver, root, entry):
+        """Return the result of the request described by ```entry```."""
+        if not isinstance(entry, dict) or 'path' not in entry:
+            return {'status': 400, 'body': None}
+        path, _sep, query = entry['path'].partition('?')
+        if path.startswith(root):
+            path = path[len(root):]
+        path = '/' + path.lstrip('/')
+
+        subrequest = copy.copy(request)
+        subrequest.method = str(entry.get('method', 'GET')).upper()
+        subrequest.path = subrequest.path_info = root + path[1:]
+        subrequest.GET = QueryDict(query)
+        subrequest.META = dict((key, value)
+                for key, value in request.META.items()
+                if not key.startswith('HTTP_IF_'))
+        subrequest.META['REQUEST_METHOD'] = subrequest.method
+        subrequest.META['QUERY_STRING'] = query
+        subrequest._body = RESTAPI.json_codec.encode(entry.get('body'))
+
+        try:
+            match = resolver.resolve(path)
+            if match.func is RESTAPI.batch:
+                return {'status': 400, 'body': None}
+            response = match.func(subrequest, *match.args, **match.kwargs)
+        except Http404:
+            return {'status': 404, 'body': None}
+        except PermissionDenied:
+            return {'status': 403, 'body': None}
+
+        request.restapi_cookies.update(response.cookies)
+        if subrequest.method not in ('GET', 'HEAD', 'OPTIONS') and \
+                response.status_code < 400:
+            request.restapi_wrote = True
+
+        if response.streaming:
+            content = b''.join(response.streaming_content)
+        else:
+            content = response.content
+        body = content.decode('utf-8') if content else None
+        if body and response.get('Content-Type', '').startswith(
+                'application/json'):
+            body = RESTAPI.json_codec.decode(body)
+        return {'status': response.status_code, 'body': body}
+
+RESTAPI.urls.append(url(r'^batch/?$', RESTAPI.batch, name='batch'))
@@ -0,0 +1,309 @@
+"""Benchmarks of the RESTView url patterns.
+
+Run with ```python -m <package>.benchmark```, where ```<package>``` is the
+name this package is installed under. Every url pattern of
+```RESTView.urls``` is requested through Django's test client on an
+in-memory SQLite database with collections of 10 up to 100000 entities.
+The requests per second, the p50 and p99 latency, the number of queries and
+the peak memory of every pattern are written as JSON, so the results of two
+commits can be compared.
+"""
+from __future__ import print_function
+import argparse
+import datetime
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+import django
+from django.conf import settings
+
+# The benchmark models belong to this package, which is installed as an
+# app so that Django sets up the reverse relations between them.
+PACKAGE = __package__ or __name__.rpartition('.')[0]
+APP_LABEL = PACKAGE.rpartition('.')[2]
+SIZES = (10, 100, 1000, 10000, 100000)
+# Number of tags, which are all linked to the first book.
+TAGS = 20
+
+urlpatterns = []
+
+def configure():
+    """Configure Django with an in-memory SQLite database and this module
+    as the url configuration."""
+    settings.configure(
+        DEBUG=False,
+        DATABASES={'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:'}},
+        INSTALLED_APPS=(PACKAGE,),
+        MIDDLEWARE_CLASSES=(),
+        ROOT_URLCONF=__name__,
+        ALLOWED_HOSTS=['*'],
+        SECRET_KEY='benchmark')
+    if hasattr(django, 'setup'):
+        django.setup()
+
+def define_models():
+    """Return the benchmark models and register a view for each of them."""
+    from django.db import models
+    from . import RESTAPI
+    from .views import RESTView
+
+    class Author(models.Model):
+        name = models.CharField(max_length=100)
+
+        class Meta:
+            app_label = APP_LABEL
+
+        def describe(self):
+            return {'id': self.pk, 'name': self.name}
+
+    class Book(models.Model):
+        title = models.CharField(max_length=100)
+        pages = models.IntegerField()
+        author = models.ForeignKey(Author)
+
+        class Meta:
+            app_label = APP_LABEL
+
+        def describe(self):
+            return {'id': self.pk, 'title': self.title, 'pages': self.pages,
+                    'author': self.author.name}
+
+        @classmethod
+        def summary(cls, request, data):
+            return {'count': cls.objects.count()}
+
+        def summarize(self, request, data):
+            return self.describe()
+
+    class Tag(models.Model):
+        name = models.CharField(max_length=100)
+        books = models.ManyToManyField(Book, related_name='tags')
+
+        class Meta:
+            app_label = APP_LABEL
+
+        def describe(self):
+            return {'id': self.pk, 'name': self.name}
+
+    class BookView(RESTView):
+        select_related = ('author',)
+
+        def get_model(self, request):
+            return Book
+
+    class TagView(RESTView):
+
+        def get_model(self, request):
+            return Tag
+
+    RESTAPI.register(Book, BookView, 'books')
+    RESTAPI.register(Tag, TagView, 'tags')
+    from django.conf.urls import url, include
+    urlpatterns.append(url(r'^api/', include(RESTAPI.urls)))
+    return Author, Book, Tag
+
+def create_tables(models):
+    """Create the tables of ```models``` and of their many2many fields."""
+    from django.db import connection
+    if hasattr(connection, 'schema_editor'):
+        with connection.schema_editor() as editor:
+            for model in models:
+                editor.create_model(model)
+        return
+
+    from django.core.management.color import no_style
+    style = no_style()
+    statements = []
+    known = set()
+    for model in models:
+        sql, _references = connection.creation.sql_create_model(model, style,
+                known)
+        statements.extend(sql)
+        known.add(model)
+    for model in models:
+        statements.extend(connection.creation.sql_for_many_to_many(model,
+            style))
+    cursor = connection.cursor()
+    for statement in statements:
+        cursor.execute(statement)
+
+def clear_tables(models):
+    """Delete the rows of ```models``` and of their many2many fields."""
+    from django.db import connection
+    tables = []
+    for model in models:
+        for field in model._meta.many_to_many:
+            tables.append(field.rel.through._meta.db_table)
+    tables.extend(model._meta.db_table for model in reversed(models))
+    cursor = connection.cursor()
+    for table in tables:
+        cursor.execute('DELETE FROM %s' % (connection.ops.quote_name(table),))
+
+def populate(size, Author, Book, Tag):
+    """Create ```size``` books and ```TAGS``` tags. The first tag is linked
+    to every book and the first book to every tag.
+
+    Return the primary keys of the first book and tag.
+    """
+    Author.objects.bulk_create([Author(name='Author %d' % (i,))
+        for i in range(size // 10 + 1)])
+    authors = list(Author.objects.values_list('pk', flat=True))
+    Book.objects.bulk_create([Book(title='Book %d' % (i,), pages=i,
+        author_id=authors[i % len(authors)]) for i in range(size)])
+    Tag.objects.bulk_create([Tag(name='Tag %d' % (i,)) for i in range(TAGS)])
+    books = list(Book.objects.order_by('pk').values_list('pk', flat=True))
+    tags = list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+    Through = Tag.books.through
+    Through.objects.bulk_create([Through(tag_id=tags[0], book_id=book)
+        for book in books])
+    Through.objects.bulk_create([Through(tag_id=tag, book_id=books[0])
+        for tag in tags[1:]])
+    return books[0], tags[0]
+
+def get_scenarios(book, tag):
+    """Return the pattern name, method and path of a request for every url
+    pattern of ```RESTView.urls```."""
+    return [
+        ('collection', 'GET', '/api/books/'),
+        ('entity', 'GET', '/api/books/%s' % (book,)),
+        ('collection_method', 'POST', '/api/books/summary'),
+        ('linked_collection', 'GET', '/api/tags/%s/books/' % (tag,)),
+        ('linked_entity', 'GET', '/api/tags/%s/books/%s' % (tag, book)),
+        ('linked_collection_method', 'POST', '/api/tags/%s/books/summary' % (
+            tag,)),
+        ('linked_entity_method', 'POST', '/api/tags/%s/books/%s/summarize' % (
+            tag, book)),
+    ]
+
+def request(client, method, path):
+    """Return the response to the request, with its content read."""
+    if method == 'GET':
+        response = client.get(path)
+    else:
+        response = client.post(path, data='{}',
+                content_type='application/json')
+    if getattr(response, 'streaming', False):
+        response.content_length = len(b''.join(response.streaming_content))
+    else:
+        response.content_length = len(response.content)
+    return response
+
+def percentile(values, p):
+    """Return the ```p```-th percentile of the sorted ```values```."""
+    return values[int(round(p / 100.0 * (len(values) - 1)))]
+
+def measure(client, method, path, iterations, budget):
+    """Return the statistics of requesting ```path``` ```iterations``` times,
+    or as often as fits in ```budget``` seconds, with a minimum of three.
+
+    Raises RuntimeError if the response is not successful, since the
+    statistics of an error response say nothing about the pattern.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        response = request(client, method, path)
+    query_count = len(queries)
+    if not 200 <= response.status_code < 300:
+        raise RuntimeError('%s %s returned %d' % (method, path,
+            response.status_code))
+
+    peak_memory = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        request(client, method, path)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    latencies = []
+    started = time.time()
+    while len(latencies) < iterations and (len(latencies) < 3
+            or time.time() - started < budget):
+        start = time.time()
+        request(client, method, path)
+        latencies.append(time.time() - start)
+    latencies.sort()
+
+    return {
+        'status': response.status_code,
+        'bytes': response.content_length,
+        'queries': query_count,
+        'requests': len(latencies),
+        'requests_per_second': len(latencies) / sum(latencies),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'peak_memory_bytes': peak_memory}
+
+def get_commit():
+    """Return the git commit of the benchmarked code, or None."""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                cwd=__file__.rpartition('/')[0] or '.').decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(sizes, iterations, budget):
+    """Return the results of benchmarking every url pattern for every
+    collection size in ```sizes```."""
+    from django.test import Client
+    Author, Book, Tag = define_models()
+    models = [Author, Book, Tag]
+    create_tables(models)
+    client = Client()
+
+    results = []
+    for size in sizes:
+        clear_tables(models)
+        book, tag = populate(size, Author, Book, Tag)
+        for pattern, method, path in get_scenarios(book, tag):
+            gc.collect()
+            result = measure(client, method, path, iterations, budget)
+            result.update({'pattern': pattern, 'method': method,
+                'path': path, 'rows': size})
+            results.append(result)
+            print('%-26s %6d rows %8.1f req/s  p50 %8.2f ms  p99 %8.2f ms'
+                    '  %d queries' % (pattern, size,
+                        result['requests_per_second'], result['p50_ms'],
+                        result['p99_ms'], result['queries']),
+                    file=sys.stderr)
+    return {
+        'commit': get_commit(),
+        'date': datetime.datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'results': results}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)),
+            help='comma-separated collection sizes')
+    parser.add_argument('--iterations', type=int, default=100,
+            help='maximum number of timed requests per pattern')
+    parser.add_argument('--budget', type=float, default=5.0,
+            help='maximum number of seconds per pattern')
+    parser.add_argument('--output', default=None,
+            help='file to write the JSON results to, default stdout')
+    args = parser.parse_args(argv)
+
+    configure()
+    report = run([int(size) for size in args.sizes.split(',')],
+            args.iterations, args.budget)
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Caching of API responses."""
+import hashlib
+import time
+try:
+    from django.core.cache import caches
+except ImportError:
+    from django.core.cache import get_cache
+else:
+    def get_cache(alias):
+        return caches[alias]
+
+class ResponseCache(object):
+    """Cache of GET responses in one of Django's caches.
+
+    The key of a response contains a generation counter of every model it
+    depends on. A write to a model increments its counter, so the cached
+    responses of that model are never found again and expire with their
+    ```timeout```. The number of lookups that found a response and that did
+    not are kept in ```hits``` and ```misses```.
+    """
+
+    # Every ResponseCache that was created, to be invalidated by ```bump_all```.
+    instances = []
+
+    def __init__(self, timeout=300, alias='default', prefix='restapi'):
+        self.timeout = timeout
+        self.alias = alias
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        ResponseCache.instances.append(self)
+
+    @property
+    def cache(self):
+        """Return the Django cache that stores the responses."""
+        return get_cache(self.alias)
+
+    def get_generation_key(self, model):
+        """Return the cache key of the generation counter of ```model```."""
+        return '%s:generation:%s.%s' % (self.prefix, model._meta.app_label,
+                model.__name__)
+
+    def get_generations(self, models):
+        """Return the generation counters of ```models```."""
+        keys = [self.get_generation_key(model) for model in models]
+        generations = self.cache.get_many(keys)
+        for key in keys:
+            if key not in generations:
+                # Start at the current time, so a counter that was evicted
+                # does not return to a value that cached responses still use.
+                self.cache.add(key, int(time.time() * 1000), None)
+                generations[key] = self.cache.get(key)
+        return [generations[key] for key in keys]
+
+    def bump(self, model):
+        """Invalidate the cached responses that depend on ```model```."""
+        key = self.get_generation_key(model)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, int(time.time() * 1000), None)
+
+    @staticmethod
+    def bump_all(model):
+        """Invalidate the responses that depend on ```model``` in all
+        caches."""
+        for response_cache in ResponseCache.instances:
+            response_cache.bump(model)
+
+    def get_key(self, request, models, vary=None):
+        """Return the cache key of the response to ```request```.
+
+        The key is made of the path, the normalized GET parameters, the
+        generations of ```models``` and ```vary```.
+        """
+        params = sorted((key, request.GET.getlist(key)) for key in request.GET)
+        digest = hashlib.md5(repr((request.path, params,
+            self.get_generations(models), vary)).encode('utf-8')).hexdigest()
+        return '%s:response:%s' % (self.prefix, digest)
+
+    def get(self, key):
+        """Return the cached response for ```key```, or None."""
+        response = self.cache.get(key)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    def set(self, key, response):
+        """Cache ```response``` for ```key```."""
+        self.cache.set(key, response, self.timeout)
@@ -0,0 +1,93 @@
+"""Instrumentation of API requests."""
+from collections import OrderedDict
+from contextlib import contextmanager
+from django.db import connections
+from django.dispatch import Signal
+import functools
+import time
+
+# Sent after an instrumented request with the arguments ```request```,
+# ```response``` and ```timing```.
+request_timed = Signal()
+
+class NullTiming(object):
+    """Context manager that records nothing, for requests that are not
+    instrumented."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_TIMING = NullTiming()
+
+class Timing(object):
+    """Wall time per phase and database statistics of a request.
+
+    The phases are e.g. ```filter```, ```permissions```, ```serialize``` and
+    ```encode```, with their durations in seconds. The database time is kept
+    apart in ```db_time```, since queries run lazily within the phases.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.total = None
+        self.phases = OrderedDict()
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.debug_cursors = []
+
+    @contextmanager
+    def phase(self, name):
+        """Add the time spent in the ```with``` block to phase ```name```."""
+        started = time.time()
+        try:
+            yield self
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + \
+                    time.time() - started
+
+    def wrap(self, name, function):
+        """Return ```function``` adding the time spent in it to phase
+        ```name```."""
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.phase(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+    def start_queries(self):
+        """Start recording the queries of all database connections."""
+        for connection in connections.all():
+            if hasattr(connection, 'force_debug_cursor'):
+                name = 'force_debug_cursor'
+            else:
+                name = 'use_debug_cursor'
+            self.debug_cursors.append((connection, name,
+                getattr(connection, name), len(connection.queries)))
+            setattr(connection, name, True)
+
+    def stop_queries(self):
+        """Stop recording queries and add up their number and time."""
+        for connection, name, previous, start in self.debug_cursors:
+            queries = list(connection.queries)[start:]
+            self.queries += len(queries)
+            self.db_time += sum(float(query['time']) for query in queries)
+            setattr(connection, name, previous)
+        self.debug_cursors = []
+
+    def finish(self):
+        """Record the total time of the request."""
+        self.total = time.time() - self.started
+
+    def header(self):
+        """Return the value of the ```Server-Timing``` header."""
+        metrics = ['%s;dur=%.2f' % (name, duration * 1000)
+                for name, duration in self.phases.items()]
+        metrics.append('db;dur=%.2f;desc="%d queries, %d rows"' % (
+            self.db_time * 1000, self.queries, self.rows))
+        if self.total is not None:
+            metrics.append('total;dur=%.2f' % (self.total * 1000,))
+        return ', '.join(metrics)
@@ -0,0 +1,67 @@
+"""Encoding and decoding of JSON request and response bodies."""
+import datetime
+import decimal
+import json
+import uuid
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Types that the codecs encode without the help of the serializer.
+NATIVE_TYPES = (datetime.date, datetime.time, decimal.Decimal, uuid.UUID)
+
+def encode_native(value):
+    """Return the JSON representation of a value of one of
+    ```NATIVE_TYPES```."""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    elif isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError('%r is not JSON serializable' % (value,))
+
+class JSONCodec(object):
+    """Codec that uses the ```json``` module of the standard library.
+
+    It writes compact JSON like ```ORJSONCodec```, but escapes non-ASCII
+    characters, so the UTF-8 byte strings of Python 2 are encoded as well.
+    """
+
+    def encode(self, value):
+        """Return ```value``` encoded as UTF-8 JSON bytes."""
+        return json.dumps(value, default=encode_native,
+                separators=(',', ':')).encode('utf-8')
+
+    def decode(self, content):
+        """Return the value of the JSON bytes or string ```content```."""
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        return json.loads(content)
+
+class ORJSONCodec(JSONCodec):
+    """Codec that uses orjson, which writes bytes directly and encodes dates
+    and UUIDs itself.
+
+    Values that orjson cannot encode, such as integers beyond 64 bits, are
+    encoded by ```JSONCodec```.
+    """
+
+    options = 0 if orjson is None else orjson.OPT_NON_STR_KEYS
+
+    def encode(self, value):
+        """Return ```value``` encoded as UTF-8 JSON bytes."""
+        try:
+            return orjson.dumps(value, default=encode_native,
+                    option=self.options)
+        except TypeError:
+            return super(ORJSONCodec, self).encode(value)
+
+    def decode(self, content):
+        """Return the value of the JSON bytes or string ```content```."""
+        return orjson.loads(content)
+
+def get_default_codec():
+    """Return the fastest codec that is available."""
+    if orjson is not None:
+        return ORJSONCodec()
+    return JSONCodec()
@@ -0,0 +1,21 @@
+"""Models of the REST API.
+
+These models are only used by views that set ```track_changes```, which
+needs this package in ```INSTALLED_APPS```.
+"""
+from django.db import models
+from django.utils import timezone
+
+class Tombstone(models.Model):
+    """Record of an entity that was deleted from a collection."""
+
+    # Label of the collection, see ```RESTView.get_change_label```.
+    collection = models.CharField(max_length=255)
+    entity_pk = models.CharField(max_length=255)
+    deleted = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        index_together = (('collection', 'deleted'),)
+
+    def __unicode__(self):
+        return u'%s %s' % (self.collection, self.entity_pk)
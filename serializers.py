@@ -0,0 +1,104 @@
+"""Serialization of API replies."""
+from django.db.models import Model
+from django.db.models.fields import FieldDoesNotExist
+from django.utils import six
+from . import RESTAPI
+from .jsoncodec import NATIVE_TYPES
+
+# Types that are left to the JSON codec as is. Besides the JSON types these
+# are the dates, times, Decimals and UUIDs that every codec encodes.
+PRIMITIVE_TYPES = (type(None), bool, float) + six.integer_types + \
+        six.string_types + NATIVE_TYPES
+
+def serialize_primitive(serializer, value):
+    """Return ```value```, which the JSON codec can represent as is."""
+    return value
+
+def serialize_dict(serializer, value):
+    """Return a copy of ```value``` with its values serialized."""
+    result = value.copy()
+    for key, elem in six.iteritems(value):
+        result[key] = serializer.serialize(elem)
+    return result
+
+def serialize_iterable(serializer, value):
+    """Return the list of the serialized elements of ```value```."""
+    return [serializer.serialize(elem) for elem in value]
+
+def serialize_object(serializer, value):
+    """Return the serialized description of ```value```, or its string
+    representation if it cannot describe itself."""
+    if callable(getattr(value, 'describe', None)):
+        return serializer.serialize(value.describe())
+    return str(value)
+
+def serialize_model(serializer, value):
+    """Return the description of ```value``` by its registered view."""
+    view = RESTAPI.get_view_instance_by_model(value.__class__)
+    if view is not None:
+        return serializer.serialize(
+                view.describe_entity(serializer.request, value))
+    elif hasattr(value, '__iter__') or hasattr(value, '__getitem__'):
+        return serialize_iterable(serializer, value)
+    else:
+        return serialize_object(serializer, value)
+
+class JSONSerializer(object):
+    """Converts a reply into a JSON-serializable structure in one pass.
+
+    How a value is serialized only depends on its class, so the function
+    that serializes a class is chosen once and kept in ```plans```.
+    """
+
+    plans = {}
+
+    def __init__(self, request):
+        self.request = request
+
+    @staticmethod
+    def compile(cls):
+        """Return the function that serializes instances of ```cls```."""
+        if issubclass(cls, PRIMITIVE_TYPES):
+            return serialize_primitive
+        elif issubclass(cls, dict):
+            return serialize_dict
+        elif issubclass(cls, Model):
+            return serialize_model
+        elif hasattr(cls, '__iter__') or hasattr(cls, '__getitem__'):
+            return serialize_iterable
+        else:
+            return serialize_object
+
+    def serialize(self, value):
+        """Return a JSON-serializable representation of ```value```."""
+        cls = value.__class__
+        try:
+            plan = JSONSerializer.plans[cls]
+        except KeyError:
+            plan = JSONSerializer.plans[cls] = JSONSerializer.compile(cls)
+        return plan(self, value)
+
+    def serialize_fields(self, value, fields, entity=None):
+        """Return the serialized ```value``` limited to the keys in ```fields```.
+
+        ```value``` is an entity or its description. When the description
+        is not a dictionary, the requested fields are read from ```entity```,
+        which defaults to ```value``` if it is a model instance.
+        """
+        if entity is None and isinstance(value, Model):
+            entity = value
+        description = self.serialize(value)
+        if isinstance(description, dict):
+            return dict((name, description[name]) for name in fields
+                    if name in description)
+        elif isinstance(entity, Model):
+            result = {}
+            for name in fields:
+                try:
+                    entity._meta.get_field(name)
+                except FieldDoesNotExist:
+                    continue
+                result[name] = self.serialize(getattr(entity, name))
+            return result
+        else:
+            return description
@@ -0,0 +1,59 @@
+"""Utilities for the REST API."""
+from collections import OrderedDict
+import threading
+
+def cacheable(ttl=60):
+    """Declare that a model method called through the API returns the same
+    output for the same entity and data for ```ttl``` seconds.
+
+    Put it below ```classmethod``` or ```staticmethod```. See
+    ```RESTView.call_method```.
+    """
+    def decorator(function):
+        function.cache_ttl = ttl
+        return function
+    return decorator
+
+class LRUCache(object):
+    """Bounded mapping that evicts its least recently used entries.
+
+    The number of lookups that found an entry and that did not are kept in
+    ```hits``` and ```misses```.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """Return the entry for ```key```, or ```default``` if there is none."""
+        with self.lock:
+            try:
+                value = self.entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.entries[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store ```value``` for ```key```, evicting the oldest entries."""
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = value
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
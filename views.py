@@ -1,18 +1,116 @@
 """REST API views."""
 from django.views.generic.base import View
 from django.db.models.fields import FieldDoesNotExist
-from django.db.models import Model
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Avg, Count, DateTimeField, Max, Min, Q, Sum
+from django.utils import six, timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, \
+        quote_etag
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.http import HttpResponse, HttpResponseRedirect, \
-        HttpResponseForbidden, HttpResponseBadRequest, Http404
+        HttpResponseForbidden, HttpResponseBadRequest, Http404, \
+        HttpResponseNotModified, HttpResponseGone, StreamingHttpResponse
+import base64
+import calendar
+import datetime
+import hashlib
 import json
+import time
+import types
 from . import RESTAPI
+from .cache import ResponseCache
+from .instrumentation import NULL_TIMING, Timing, request_timed
+from .serializers import JSONSerializer
+from .utils import LRUCache
+
+class LinkedEntityDoesNotExist(TypeError):
+    """Raised when an entity to link or unlink cannot be found.
+
+    Like every TypeError of a view it is a HTTP 404, but ```post``` does not
+    mistake it for a URL that names an entity method.
+    """
 
 class RESTView(View):
     """Base view for RESTful API's on Django models."""
 
+    # Number of entities per page when the request does not specify a
+    # ```limit```. None disables pagination unless it is requested.
+    page_size = None
+    # Upper bound for the ```limit``` a request may ask for.
+    max_page_size = 1000
+    # Include the total number of entities in paginated collections.
+    include_count = True
+    # Fields that paginated collections are ordered on, unless the request
+    # passes ```ordering```.
+    ordering = ('pk',)
+    # Lookups that may follow a field name in a GET filter.
+    filter_lookups = ('exact', 'in', 'range', 'gt', 'gte', 'lt', 'lte')
+    # Cache of filter plans by model.
+    filter_plans = {}
+    # Stream unpaginated collections as a JSON array instead of building
+    # the complete reply in memory.
+    streaming = False
+    # Number of entities fetched per query while streaming.
+    stream_chunk_size = 500
+    # Relations of the model that are loaded together with the entities of
+    # a collection, as passed to ```select_related``` and
+    # ```prefetch_related```.
+    select_related = ()
+    prefetch_related = ()
+    # Derive the relations to load from the model when none are declared.
+    auto_prefetch = False
+    # Cache of prefetch plans by view class and model.
+    prefetch_plans = {}
+    # Fields that ```describe_entity```, the ```describe``` method of the
+    # model and ```can_get_entity``` read, so ```?fields``` can defer the
+    # other columns. None if they are unknown, which loads every column.
+    describe_fields = None
+    # Cache of ModelForm classes by model and set of field names.
+    model_forms = LRUCache(maxsize=256)
+    # Cache of the outputs of ```cacheable``` model methods.
+    method_results = LRUCache(maxsize=1024)
+    # Generation counters per model in Django's default cache, part of the
+    # keys of ```method_results```. Writes through a RESTView in any process
+    # that shares the cache increment them, see ```entities_changed```.
+    method_generations = ResponseCache(prefix='restapi:methods')
+    # Number of entities inserted per query by a bulk create.
+    bulk_create_batch_size = 500
+    # Field that holds the time an entity was last modified. None looks for
+    # a DateTimeField with ```auto_now```.
+    last_modified_field = None
+    # ResponseCache that stores the GET responses of this view, None to
+    # disable caching.
+    response_cache = None
+    # Record the time per phase, the queries and the rows of every request,
+    # reported in a ```Server-Timing``` header and the ```request_timed```
+    # signal.
+    instrument = False
+    # Codec that encodes responses and decodes request bodies, None to use
+    # ```RESTAPI.json_codec```.
+    json_codec = None
+    # Fields that ```?aggregate``` may aggregate and ```?group_by``` may group
+    # on. Only ```count``` of the entities is allowed on other fields.
+    aggregate_fields = ()
+    # Aggregate functions that ```?aggregate``` may use, by name.
+    aggregate_functions = {'count': Count, 'sum': Sum, 'avg': Avg,
+            'min': Min, 'max': Max}
+    # Record the entities deleted through this view in the ```Tombstone```
+    # table, so ```?since``` can return the changes of a collection. This
+    # needs this package in ```INSTALLED_APPS``` and a last modified field.
+    track_changes = False
+    # How long deletions are kept. Older ```since``` tokens get a HTTP 410.
+    change_retention = datetime.timedelta(days=30)
+    # Alias of the database that GET and HEAD requests read from, None to
+    # read from the default database.
+    read_database = None
+    # Seconds after a write during which the reads of the same client go to
+    # the default database, so it sees its own writes.
+    sticky_window = 5
+    # Cookie that holds the end of the ```sticky_window``` of a client.
+    sticky_cookie = 'restapi_primary'
+
     @classmethod
     def urls(cls):
         """Returns the list of url patterns used by this API.
@@ -20,15 +118,40 @@ class RESTView(View):
         These url patterns are:
 
         GET /
-            Return the collection of entities
+            Return the collection of entities. The query string filters the
+            collection, see ```filter_queryset```, and may order it by a
+            comma-separated list of fields in ```ordering```. The collection
+            is paginated when ```limit``` or ```cursor``` is given in the
+            query string or when ```page_size``` is set, see
+            ```paginate_queryset```.
+            Otherwise the collection is streamed if ```streaming``` is set.
+            A comma-separated list of keys in ```fields``` limits the entities
+            to those keys, see ```sparse_queryset```.
+            With ```count=only``` only the number of entities is returned.
+            With ```aggregate```, e.g. ```?aggregate=count,sum:amount```,
+            only the aggregates over the ```aggregate_fields``` of the view
+            of the model in the collection are returned, per group of the
+            fields in ```group_by``` if given.
+            With ```since``` only the changes since a token are returned,
+            if ```track_changes``` is set, see ```build_changes```.
+
+        HEAD /
+            Return the number of entities in the collection in the
+            ```X-Total-Count``` header.
 
         GET /<entity>
-            Return the details of ```<entity>```
+            Return the details of ```<entity>```, limited to the keys in
+            ```fields``` if given.
 
         GET /<entity>/<link>/
             Return the collection of entities that are linked
             to ```<entity>``` by ```<link>```. By default ```<link>``` must
             be a many2many field in the Django model of ```<entity>```.
+            The query string is handled as for ```GET /```.
+
+        HEAD /<entity>/<link>/
+            Return the number of linked entities in the ```X-Total-Count```
+            header.
 
         GET /<entity>/<link>/<linked_entity>
             Return the entity ```<linked_entity>``` that is
@@ -37,7 +160,29 @@ class RESTView(View):
         PUT /<entity>
             Alter the properties of ```<entity>``` based on the key-value pairs
             in the payload. Return a HTTP 404 when ```<entity>``` cannot be
-            found.
+            found. Return a HTTP 412 when an ```If-Match``` header does not
+            match the current ETag of ```<entity>```.
+
+        PATCH /<entity>
+            Alter only the properties of ```<entity>``` that are in the
+            payload, see ```patch_entity```, and return a HTTP 204. Return a
+            HTTP 412 as for PUT.
+
+        PATCH /
+            Alter the properties in the payload of every entity in the
+            filtered collection and return their number in ```count```.
+            At least one filter is required.
+
+        GET and HEAD requests read from ```read_database``` if it is set,
+        except for clients that wrote within the ```sticky_window```.
+
+        GET responses are cached when ```response_cache``` is set, until the
+        models they depend on are changed through any RESTView.
+
+        All GET requests return an ETag, and a Last-Modified header if the
+        model has a modification time, and return a HTTP 304 when the
+        ```If-None-Match``` or ```If-Modified-Since``` header shows that the
+        client is up to date.
 
         DELETE /<entity>
             Delete the entity ```<entity>```.
@@ -47,10 +192,16 @@ class RESTView(View):
             that was identified by ```<link>```.
             By default ```<linked_entity>``` is not deleted.
 
+        DELETE /<entity>/<link>/
+            Remove the links between ```<entity>``` and the entities in the
+            payload, a list of primary keys or of sets of key-value pairs.
+
         POST /
             Create a new entity based on the payload.
             Return a HTTP 302 redirect to the URL that returns the details
             of the newly created entity.
+            If the payload is a list, an entity is created for every item in
+            it, see ```create_entities```.
 
         POST /<method>
             Return the output of ```<method>```, where ```<method>``` is either
@@ -61,12 +212,17 @@ class RESTView(View):
             Add a new link between ```<entity>``` and the entity specified
             by a set of key-value pairs in the payload. By default a HTTP 404
             is returned if the specified entity cannot be found.
+            If the payload is a list of primary keys or of sets of key-value
+            pairs, a link is added to each of the specified entities.
 
         POST /<entity>/<method>
             Return the output of ```<method>```, where ```<method>``` is an
             instance method. The method must belong to the instance referenced
             by ```<entity>```.
 
+        The output of model methods that are declared ```cacheable``` is
+        reused for repeated calls, see ```call_method```.
+
         POST /<entity>/<link>/<method>
             Return the output of ```<method>```, where ```<method>``` is either
             a class method or a static method. The method must belong to the
@@ -80,6 +236,10 @@ class RESTView(View):
             by ```<linked_entity>```.
             The arguments of the method are the request object,
             the entity ```<entity>``` and the link name ```<link>```.
+
+        Besides these url patterns, ```RESTAPI.urls``` contains ```batch/```,
+        which runs a list of requests to the registered views in one HTTP
+        request, see ```RESTAPI.batch```.
         """
         from django.conf.urls import url
         return [
@@ -134,22 +294,165 @@ class RESTView(View):
 
         return getattr(entity, link)
 
+    def get_filter_plan(self, model):
+        """Return the fields of ```model``` that GET filters can refer to.
+
+        The plan maps a field name to the path used in queries, the function
+        that converts a GET value to the type of the field and whether the
+        field can match several rows, as many2many fields and reverse
+        relations do. Foreign keys are compared by the value of their
+        column, so filtering on them needs no extra query. Reverse relations
+        are compared by the primary key of the related entity.
+        """
+        try:
+            return RESTView.filter_plans[model]
+        except KeyError:
+            pass
+
+        plan = {}
+        for name in model._meta.get_all_field_names():
+            try:
+                field, _m, direct, m2m = model._meta.get_field_by_name(name)
+            except FieldDoesNotExist:
+                continue
+            if not direct:
+                related = getattr(field, 'related_model', None) or field.model
+                plan[name] = (name, related._meta.pk.to_python, True)
+            elif m2m:
+                plan[name] = (name, field.rel.to._meta.pk.to_python, True)
+            elif field.rel is not None:
+                plan[name] = (field.attname,
+                        field.rel.get_related_field().to_python, False)
+            else:
+                plan[name] = (name, field.to_python, False)
+
+        RESTView.filter_plans[model] = plan
+        return plan
+
+    def get_filter_conditions(self, request, model, exact=True):
+        """Return the keyword arguments for ```filter``` given by the GET
+        filters of the request, leaving out the filters without a lookup
+        unless ```exact```."""
+        plan = self.get_filter_plan(model)
+        conditions = {}
+        for param, value in request.GET.iteritems():
+            name, _sep, lookup = param.partition('__')
+            if name not in plan or (lookup and
+                    lookup not in self.filter_lookups):
+                continue
+            elif not lookup and not exact:
+                continue
+            path, to_python, _m2m = plan[name]
+            if lookup in ('in', 'range'):
+                value = [to_python(elem) for elem in value.split(',')]
+                if lookup == 'range' and len(value) != 2:
+                    raise ValueError('A range needs two values: %s' % (
+                        param,))
+            else:
+                value = to_python(value)
+            if lookup and lookup != 'exact':
+                path = '%s__%s' % (path, lookup)
+            conditions[path] = value
+        return conditions
+
     def filter_queryset(self, request, queryset):
-        """Return a filtered queryset based on the request."""
-        fieldnames = queryset.model._meta.get_all_field_names()
-        for field, value in request.GET.iteritems():
-            if field in fieldnames:
-                queryset = self.apply_filter(request, queryset, field, value)
+        """Return a filtered queryset based on the request.
+
+        A GET parameter filters on the field it names. The name may be
+        followed by one of ```filter_lookups```, e.g. ```?age__gte=18```.
+        The values of ```in``` and ```range``` are comma-separated.
+        A view that overrides ```apply_filter``` has it applied to every
+        filter without a lookup. Filters on fields that match several rows
+        make the queryset distinct, since their joins repeat entities.
+        """
+        with self.timed(request, 'filter'):
+            model = queryset.model
+            plan = self.get_filter_plan(model)
+            custom = self.overrides('apply_filter')
+            conditions = self.get_filter_conditions(request, model,
+                    exact=not custom)
+            if conditions:
+                queryset = queryset.filter(**conditions)
+            if custom:
+                for field, value in request.GET.iteritems():
+                    if field in plan:
+                        queryset = self.apply_filter(request, queryset,
+                                field, value)
+            names = set(param.partition('__')[0] for param in request.GET)
+            if any(plan[name][2] for name in names if name in plan):
+                queryset = queryset.distinct()
         return queryset
 
     def apply_filter(self, request, queryset, field, value):
-        """Apply the GET filter to the queryset."""
-        field_obj = queryset.model._meta.get_field(field)
-        if field_obj.rel is None:
-            return queryset.filter(**{field:value})
-        else:
-            reference = get_object_or_404(field_obj.rel.to, pk=value)
-            return queryset.filter(**{field:reference})
+        """Apply the GET filter on ```field``` without a lookup to the
+        queryset."""
+        path, to_python, _m2m = self.get_filter_plan(queryset.model)[field]
+        return queryset.filter(**{path: to_python(value)})
+
+    def overrides(self, name):
+        """Return if this view overrides the ```RESTView``` method ```name```."""
+        return getattr(type(self), name) != getattr(RESTView, name)
+
+    def get_read_database(self, request):
+        """Return the alias of the database that ```request``` reads from, or
+        None for the default database.
+
+        Only GET and HEAD requests read from ```read_database```, unless the
+        client wrote within the ```sticky_window``` or an earlier request of
+        the same batch wrote.
+        """
+        if self.read_database is None or \
+                request.method not in ('GET', 'HEAD') or \
+                getattr(request, 'restapi_wrote', False):
+            return None
+        try:
+            if float(request.COOKIES[self.sticky_cookie]) > time.time():
+                return None
+        except (KeyError, ValueError):
+            pass
+        return self.read_database
+
+    def use_read_database(self, request, queryset):
+        """Return ```queryset``` on the database that ```request``` reads
+        from."""
+        alias = self.get_read_database(request)
+        if alias is None:
+            return queryset
+        return queryset.using(alias)
+
+    def set_sticky_cookie(self, request, response):
+        """Send reads of the client to the default database for
+        ```sticky_window``` seconds, if ```request``` was a successful
+        write."""
+        if self.read_database is not None and \
+                request.method not in ('GET', 'HEAD', 'OPTIONS') and \
+                response.status_code < 400:
+            response.set_cookie(self.sticky_cookie,
+                    str(time.time() + self.sticky_window),
+                    max_age=self.sticky_window)
+        return response
+
+    def restrict_queryset(self, request, queryset):
+        """Return ```queryset``` limited to the entities that may be retrieved.
+
+        Collections are then filtered by the database instead of calling
+        ```can_get_entity``` for each entity. Return None to keep calling
+        ```can_get_entity```. Single entities are looked up, changed and
+        deleted through the restricted queryset too, so an entity outside
+        it is not found.
+        """
+        return None
+
+    def restrict_linked_queryset(self, request, entity, link, queryset):
+        """Return ```queryset``` limited to the linked entities that may be
+        retrieved.
+
+        Linked collections are then filtered by the database instead of
+        calling ```can_get_linked_entity``` for each linked entity. Return None
+        to keep calling ```can_get_linked_entity```. Single linked entities
+        are looked up through the restricted queryset too.
+        """
+        return None
 
     def can_get_entity(self, request, entity):
         """Return if ```entity``` may be retrieved."""
@@ -175,6 +478,11 @@ class RESTView(View):
         """Return if ```entity``` may be deleted."""
         return self.can_edit_entity(request, entity)
 
+    def entities_changed(self, request, model):
+        """Called after entities of ```model``` were created, edited, deleted
+        or linked through this view."""
+        ResponseCache.bump_all(model)
+
     def describe_entity(self, request, entity):
         """Return a serializable description of ```entity```."""
         if callable(getattr(entity, 'describe', None)):
@@ -190,33 +498,710 @@ class RESTView(View):
         """Return if ```linked_entity``` may be deleted."""
         return self.can_create_linked_entity(request, entity, link, linked_entity)
 
+    def can_create_linked_entities(self, request, entity, link,
+            linked_entities):
+        """Return if all ```linked_entities``` may be linked to entity."""
+        return all(self.can_create_linked_entity(request, entity, link,
+            linked_entity) for linked_entity in linked_entities)
+
+    def can_delete_linked_entities(self, request, entity, link,
+            linked_entities):
+        """Return if all ```linked_entities``` may be deleted."""
+        return all(self.can_delete_linked_entity(request, entity, link,
+            linked_entity) for linked_entity in linked_entities)
+
+    def get_ordering(self, request, model):
+        """Return the field names that collections of ```model``` are
+        ordered on.
+
+        Foreign keys are replaced by the name of their column. The primary
+        key is appended when missing, so every entity has a unique position
+        in the ordering.
+        """
+        if request.GET.get('ordering'):
+            names = request.GET['ordering'].split(',')
+        else:
+            names = self.ordering
+        plan = self.get_filter_plan(model)
+        pk_names = set(['pk', model._meta.pk.attname])
+        ordering = []
+        for name in names:
+            prefix = '-' if name.startswith('-') else ''
+            name = name.lstrip('-')
+            if name != 'pk':
+                if name not in plan or plan[name][2]:
+                    raise ValueError('Cannot order on field: %s' % (name,))
+                name = plan[name][0]
+            ordering.append(prefix + name)
+        if not pk_names & set(name.lstrip('-') for name in ordering):
+            ordering.append('pk')
+        return ordering
+
+    def is_paginated(self, request):
+        """Return if the collection in the response must be paginated."""
+        return (self.page_size is not None or 'limit' in request.GET
+                or 'cursor' in request.GET)
+
+    def get_page_size(self, request):
+        """Return the number of entities on a page."""
+        limit = request.GET.get('limit')
+        if limit is None:
+            limit = self.page_size or self.max_page_size
+        limit = int(limit)
+        if limit < 1:
+            raise ValueError('The limit must be a positive integer.')
+        return min(limit, self.max_page_size)
+
+    def encode_cursor(self, values, reverse):
+        """Return an opaque cursor pointing just beyond ```values```."""
+        return base64.urlsafe_b64encode(
+                json.dumps({'v': values, 'r': reverse}).encode('utf-8')
+                ).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        """Return the values and direction encoded in ```cursor```."""
+        try:
+            data = json.loads(base64.urlsafe_b64decode(
+                str(cursor)).decode('utf-8'))
+            return list(data['v']), bool(data['r'])
+        except (TypeError, ValueError, KeyError):
+            raise ValueError('Invalid cursor: %s' % (cursor,))
+
+    def get_cursor_values(self, ordering, entity):
+        """Return the values of ```entity``` for the ordering fields."""
+        values = []
+        for name in ordering:
+            value = getattr(entity, name.lstrip('-'))
+            try:
+                json.dumps(value)
+            except TypeError:
+                value = str(value)
+            values.append(value)
+        return values
+
+    def get_keyset_filter(self, ordering, values, reverse):
+        """Return a Q object selecting the entities that come after
+        ```values``` in ```ordering```, or before them if ```reverse```."""
+        keyset = None
+        for i, name in enumerate(ordering):
+            descending = name.startswith('-')
+            lookup = 'gt' if descending == reverse else 'lt'
+            term = Q(**{'%s__%s' % (name.lstrip('-'), lookup): values[i]})
+            for previous, value in zip(ordering[:i], values[:i]):
+                term &= Q(**{previous.lstrip('-'): value})
+            keyset = term if keyset is None else keyset | term
+        return keyset
+
+    def get_page_query(self, request, queryset):
+        """Return the bounded query that fetches the requested page of
+        ```queryset```, and the state that ```get_page``` needs to turn its
+        result into a page."""
+        limit = self.get_page_size(request)
+        ordering = self.get_ordering(request, queryset.model)
+        nullable = set(field.attname for field in queryset.model._meta.fields
+                if field.null)
+        for name in ordering:
+            if name.lstrip('-') in nullable:
+                # Where NULL sorts differs per database, so a cursor cannot
+                # tell which entities come after it.
+                raise ValueError('Cannot paginate on nullable field: %s' % (
+                    name.lstrip('-'),))
+        cursor = request.GET.get('cursor')
+        if cursor:
+            values, reverse = self.decode_cursor(cursor)
+            if len(values) != len(ordering):
+                raise ValueError('Invalid cursor: %s' % (cursor,))
+        else:
+            values, reverse = None, False
+
+        if reverse:
+            order_by = [name[1:] if name.startswith('-') else '-' + name
+                    for name in ordering]
+        else:
+            order_by = ordering
+        queryset = queryset.order_by(*order_by)
+        if values is not None:
+            queryset = queryset.filter(
+                    self.get_keyset_filter(ordering, values, reverse))
+        return queryset[:limit + 1], (limit, ordering, values, reverse)
+
+    def get_page(self, request, entities, state):
+        """Return the entities on the page and the cursors of the next and
+        previous page, given the ```entities``` fetched by the page query."""
+        limit, ordering, values, reverse = state
+        has_more = len(entities) > limit
+        entities = entities[:limit]
+        if reverse:
+            entities.reverse()
+
+        next_cursor = previous_cursor = None
+        if entities:
+            if has_more or reverse:
+                next_cursor = self.encode_cursor(
+                        self.get_cursor_values(ordering, entities[-1]), False)
+            if (has_more and reverse) or (values is not None and not reverse):
+                previous_cursor = self.encode_cursor(
+                        self.get_cursor_values(ordering, entities[0]), True)
+        return entities, next_cursor, previous_cursor
+
+    def paginate_queryset(self, request, queryset):
+        """Return a page of ```queryset``` with the cursors of its neighbours.
+
+        The page is selected with ```limit``` and ```cursor``` from the query
+        string and fetched in one bounded keyset query, so deep pages do not
+        cost an OFFSET scan. Returns a tuple of the entities on the page, the
+        cursor of the next page and the cursor of the previous page.
+        """
+        query, state = self.get_page_query(request, queryset)
+        return self.get_page(request, list(query), state)
+
+    def is_streaming(self, request):
+        """Return if the collection in the response must be streamed."""
+        return self.streaming and not self.is_paginated(request)
+
+    def iter_queryset(self, request, queryset):
+        """Yield the entities of ```queryset``` in chunks.
+
+        Every chunk of ```stream_chunk_size``` entities is fetched with its
+        own keyset query, so only one chunk is held in memory at a time.
+        """
+        ordering = self.get_ordering(request, queryset.model)
+        queryset = queryset.order_by(*ordering)
+        # Prefetched relations are not loaded by iterator()
+        prefetch = self.get_prefetch_plan(request, queryset.model)[1]
+        chunk = queryset
+        while True:
+            count = 0
+            entities = chunk[:self.stream_chunk_size]
+            if not prefetch:
+                entities = entities.iterator()
+            for entity in entities:
+                count += 1
+                yield entity
+            if count < self.stream_chunk_size:
+                return
+            chunk = queryset.filter(self.get_keyset_filter(ordering,
+                self.get_cursor_values(ordering, entity), False))
+
+    def get_collection_queryset(self, request):
+        """Return the queryset of the collection and the check that each of
+        its entities must pass, or None if the queryset is restricted."""
+        base_queryset = self.use_read_database(request,
+                self.get_model(request).objects)
+        queryset = self.filter_queryset(request, base_queryset)
+        restricted_queryset = self.restrict_queryset(request, queryset)
+        if restricted_queryset is not None:
+            return restricted_queryset, None
+        elif not self.overrides('can_get_entity'):
+            return queryset, None
+        else:
+            return queryset, (lambda entity:
+                    self.can_get_entity(request, entity))
+
+    def get_linked_collection_queryset(self, request, entity, link):
+        """Return the queryset of the linked collection and the check that
+        each of its entities must pass, or None if the queryset is
+        restricted."""
+        base_queryset = self.use_read_database(request,
+                self.get_linked_queryset(request, entity, link))
+        queryset = self.filter_queryset(request, base_queryset)
+        restricted_queryset = self.restrict_linked_queryset(request, entity,
+                link, queryset)
+        if restricted_queryset is not None:
+            return restricted_queryset, None
+        elif not self.overrides('can_get_linked_entity'):
+            return queryset, None
+        else:
+            return queryset, (lambda linked_entity:
+                    self.can_get_linked_entity(request, entity, link,
+                        linked_entity))
+
+    def get_prefetch_plan(self, request, model):
+        """Return the relations of ```model``` to load with ```select_related```
+        and ```prefetch_related``` when a collection of it is retrieved.
+
+        The relations declared on this view are used for its own model. The
+        relations of other models are taken from the view that is registered
+        for them, since that view describes their entities. With
+        ```auto_prefetch``` the forward relations to models that have a
+        registered view are loaded when no relations are declared.
+        """
+        key = (type(self), model)
+        if key in RESTView.prefetch_plans:
+            return RESTView.prefetch_plans[key]
+
+        if model is not self.get_model(request):
+            view = RESTAPI.get_view_instance_by_model(model)
+            if view is None or isinstance(self, type(view)):
+                plan = ((), ())
+            else:
+                plan = view.get_prefetch_plan(request, model)
+        elif self.select_related or self.prefetch_related \
+                or not self.auto_prefetch:
+            plan = (tuple(self.select_related), tuple(self.prefetch_related))
+        else:
+            plan = (
+                tuple(field.name for field in model._meta.fields
+                    if field.rel is not None
+                    and RESTAPI.get_view_by_model(field.rel.to) is not None),
+                tuple(field.name for field in model._meta.many_to_many
+                    if RESTAPI.get_view_by_model(field.rel.to) is not None))
+
+        RESTView.prefetch_plans[key] = plan
+        return plan
+
+    def prefetch_queryset(self, request, queryset, fields=None):
+        """Return ```queryset``` loading the relations in its prefetch plan.
+
+        If ```fields``` is given, only the relations that start with one of
+        ```fields``` are loaded.
+        """
+        select, prefetch = self.get_prefetch_plan(request, queryset.model)
+        if fields is not None:
+            select = [lookup for lookup in select
+                    if lookup.split('__')[0] in fields]
+            prefetch = [lookup for lookup in prefetch
+                    if lookup.split('__')[0] in fields]
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    def get_sparse_fields(self, request):
+        """Return the keys requested with ```fields```, or None."""
+        fields = request.GET.get('fields')
+        if not fields:
+            return None
+        return [name for name in fields.split(',') if name]
+
+    def sparse_queryset(self, request, queryset, fields, describe=True):
+        """Return ```queryset``` loading only the columns of ```fields```, and
+        whether it returns dictionaries instead of entities.
+
+        Dictionaries are returned by ```values``` when every field is a plain
+        column, the queryset is not distinct and the entities need no
+        ```describe``` or check, which is decided by ```describe```. Otherwise the other columns are deferred
+        with ```only```, keeping the columns in ```describe_fields``` when
+        the entities are described or checked. If these are unknown, or
+        some keys are not plain columns, every column is loaded.
+        """
+        model = queryset.model
+        plan = self.get_filter_plan(model)
+        if not all(name in plan and not plan[name][2] for name in fields):
+            return self.prefetch_queryset(request, queryset), False
+
+        depends = ()
+        if describe or callable(getattr(model, 'describe', None)):
+            depends = self.get_describe_fields(request, model)
+            if depends is None:
+                return self.prefetch_queryset(request, queryset), False
+
+        if not describe and not self.is_paginated(request) \
+                and not self.is_streaming(request) \
+                and not queryset.query.distinct \
+                and not callable(getattr(model, 'describe', None)) \
+                and all(plan[name][0] == name for name in fields):
+            return queryset.values(*fields), True
+
+        names = set(fields) | set(depends)
+        columns = dict((path, name) for name, (path, _t, m2m) in plan.items()
+                if not m2m)
+        for name in self.get_ordering(request, model):
+            if name.lstrip('-') in columns:
+                names.add(columns[name.lstrip('-')])
+        queryset = self.prefetch_queryset(request, queryset, names)
+        return queryset.only(*names), False
+
+    def get_describe_fields(self, request, model):
+        """Return the fields that describing and checking the entities of
+        ```model``` read, or None if they are unknown.
+
+        The entities of a linked collection are described by the view that
+        is registered for their model, unless this view overrides
+        ```describe_linked_entity``` or ```can_get_linked_entity```.
+        """
+        if model is self.get_model(request):
+            return self.describe_fields
+        elif self.overrides('describe_linked_entity') or \
+                self.overrides('can_get_linked_entity'):
+            return None
+        view = RESTAPI.get_view_instance_by_model(model)
+        if view is None:
+            return None
+        return view.describe_fields
+
+    def build_collection(self, request, queryset, check, describe=None):
+        """Return the collection of entities in ```queryset``` that pass
+        ```check```, described by ```describe``` if given.
+
+        The collection is a page of entities if the request is paginated,
+        a generator if it is streamed and a list otherwise.
+        """
+        fields = self.get_sparse_fields(request)
+        serializer = JSONSerializer(request)
+        timing = getattr(request, 'restapi_timing', None)
+        if timing is not None and check is not None:
+            check = timing.wrap('permissions', check)
+
+        def visible(entities):
+            for entity in entities:
+                if timing is not None:
+                    timing.rows += 1
+                if check is None or check(entity):
+                    description = entity
+                    if describe is not None:
+                        description = describe(entity)
+                    if fields is not None:
+                        description = serializer.serialize_fields(
+                                description, fields, entity)
+                    yield description
+
+        if fields is None:
+            queryset, rows = self.prefetch_queryset(request, queryset), False
+        else:
+            queryset, rows = self.sparse_queryset(request, queryset, fields,
+                    check is not None or describe is not None
+                    or self.overrides('describe_entity'))
+        if self.is_paginated(request):
+            entities, next_cursor, previous_cursor = self.paginate_queryset(
+                    request, queryset)
+            page = {
+                'results': list(visible(entities)),
+                'next': next_cursor,
+                'previous': previous_cursor}
+            if self.include_count:
+                page['count'] = self.count_collection(request, queryset,
+                        check)
+            return page
+        elif self.is_streaming(request):
+            return visible(self.iter_queryset(request, queryset))
+        elif request.GET.get('ordering'):
+            return list(visible(queryset.order_by(
+                *self.get_ordering(request, queryset.model))))
+        elif rows:
+            return list(visible(queryset))
+        else:
+            return list(visible(set(queryset.all())))
+
+    def count_collection(self, request, queryset, check):
+        """Return the number of entities in ```queryset``` that pass
+        ```check```.
+
+        The entities are counted by the database, unless every entity must
+        be checked.
+        """
+        if check is None:
+            return queryset.count()
+        return sum(1 for entity in queryset.all().iterator() if check(entity))
+
+    def get_collection_count(self, request):
+        """Return the number of entities in the collection."""
+        queryset, check = self.get_collection_queryset(request)
+        return self.count_collection(request, queryset, check)
+
+    def get_linked_collection_count(self, request, instance_pk_or_entity,
+            link):
+        """Return the number of entities in the linked collection."""
+        entity = self.get_entity(request, instance_pk_or_entity)
+        queryset, check = self.get_linked_collection_queryset(request,
+                entity, link)
+        return self.count_collection(request, queryset, check)
+
+    def get_aggregate_fields(self, request, model):
+        """Return the fields of ```model``` that may be aggregated and
+        grouped on.
+
+        These are the ```aggregate_fields``` of this view for its own model
+        and of the view registered for ```model``` otherwise.
+        """
+        if model is self.get_model(request):
+            return self.aggregate_fields
+        view = RESTAPI.get_view_instance_by_model(model)
+        if view is None:
+            return ()
+        return view.aggregate_fields
+
+    def get_aggregates(self, request, fields):
+        """Return the list of names and aggregates given by the
+        comma-separated ```aggregate``` GET parameter.
+
+        An aggregate is ```count``` or a function and one of ```fields```,
+        e.g. ```sum:amount```.
+        """
+        aggregates = []
+        for name in request.GET['aggregate'].split(','):
+            function, _sep, field = name.strip().partition(':')
+            if function not in self.aggregate_functions:
+                raise ValueError('Unknown aggregate function: %s' % (
+                    function,))
+            if not field and function == 'count':
+                field = 'pk'
+            elif field not in fields:
+                raise PermissionDenied('Field `%s` cannot be aggregated.' % (
+                    field,))
+            aggregates.append((name.strip(),
+                self.aggregate_functions[function](field)))
+        return aggregates
+
+    def get_group_by(self, request, fields):
+        """Return the fields given by the comma-separated ```group_by``` GET
+        parameter, which must be in ```fields```."""
+        group_by = [name.strip() for name in
+                request.GET.get('group_by', '').split(',') if name.strip()]
+        for name in group_by:
+            if name not in fields:
+                raise PermissionDenied('Field `%s` cannot be grouped on.' % (
+                    name,))
+        return group_by
+
+    def aggregate_collection(self, request, queryset, check):
+        """Return the aggregates of the request over ```queryset```.
+
+        The database computes the aggregates, as a dictionary or, with
+        ```group_by```, as a list with a dictionary for every group. This
+        needs a queryset that is not checked entity by entity. A distinct
+        queryset is aggregated over the primary keys it selects, so the
+        joins of its filters do not count an entity twice.
+        """
+        if check is not None:
+            raise PermissionDenied('This collection cannot be aggregated.')
+        fields = self.get_aggregate_fields(request, queryset.model)
+        aggregates = self.get_aggregates(request, fields)
+        aliases = dict(('aggregate_%d' % (i,), aggregate)
+                for i, (_name, aggregate) in enumerate(aggregates))
+        names = [('aggregate_%d' % (i,), name)
+                for i, (name, _aggregate) in enumerate(aggregates)]
+        group_by = self.get_group_by(request, fields)
+        if queryset.query.distinct:
+            queryset = queryset.model.objects.using(queryset.db).filter(
+                    pk__in=queryset.values('pk'))
+        else:
+            queryset = queryset.all()
+
+        if not group_by:
+            values = queryset.aggregate(**aliases)
+            return dict((name, values[alias]) for alias, name in names)
+        rows = queryset.order_by().values(*group_by).annotate(
+                **aliases).order_by(*group_by)
+        results = []
+        for row in rows:
+            result = dict((name, row[name]) for name in group_by)
+            result.update((name, row[alias]) for alias, name in names)
+            results.append(result)
+        return results
+
+    def get_collection_aggregates(self, request):
+        """Return the aggregates of the collection."""
+        queryset, check = self.get_collection_queryset(request)
+        return self.aggregate_collection(request, queryset, check)
+
+    def get_linked_collection_aggregates(self, request,
+            instance_pk_or_entity, link):
+        """Return the aggregates of the linked collection."""
+        entity = self.get_entity(request, instance_pk_or_entity)
+        queryset, check = self.get_linked_collection_queryset(request,
+                entity, link)
+        return self.aggregate_collection(request, queryset, check)
+
+    def get_change_label(self, entity_or_model, link=None):
+        """Return the label of a collection in the ```Tombstone``` table.
+
+        This is the model of the collection, or for a linked collection the
+        entity and ```link```.
+        """
+        meta = entity_or_model._meta
+        label = '%s.%s' % (meta.app_label, meta.object_name)
+        if link is not None:
+            label = '%s:%s:%s' % (label, entity_or_model.pk, link)
+        return label
+
+    def record_deletions(self, request, label, pks):
+        """Record that the entities with primary keys ```pks``` were deleted
+        from the collection ```label```, if changes are tracked.
+
+        Deletions older than ```change_retention``` are pruned.
+        """
+        if not self.track_changes or not pks:
+            return
+        from .models import Tombstone
+        now = timezone.now()
+        Tombstone.objects.bulk_create([Tombstone(collection=label,
+            entity_pk=six.text_type(pk), deleted=now) for pk in pks])
+        Tombstone.objects.filter(
+                deleted__lt=now - self.change_retention).delete()
+
+    def record_links(self, request, entity, linked_entities):
+        """Mark ```entity``` and the ```linked_entities``` that were linked
+        to it as modified, if changes are tracked, so the linked collections
+        on both sides report the new links."""
+        if not self.track_changes or not linked_entities:
+            return
+        now = timezone.now()
+        for model, pks in ((entity.__class__, [entity.pk]),
+                (linked_entities[0].__class__,
+                    [linked_entity.pk for linked_entity in linked_entities])):
+            field = self.get_last_modified_field(model)
+            if field is not None:
+                model.objects.filter(pk__in=pks).update(**{field: now})
+
+    def encode_change_token(self, timestamp):
+        """Return an opaque token for the changes after ```timestamp```."""
+        return base64.urlsafe_b64encode(
+                json.dumps({'t': timestamp.isoformat()}).encode('utf-8')
+                ).decode('ascii')
+
+    def decode_change_token(self, token):
+        """Return the timestamp encoded in ```token```."""
+        try:
+            data = json.loads(base64.urlsafe_b64decode(
+                str(token)).decode('utf-8'))
+            timestamp = parse_datetime(data['t'])
+        except (TypeError, ValueError, KeyError):
+            timestamp = None
+        if timestamp is None:
+            raise ValueError('Invalid token: %s' % (token,))
+        return timestamp
+
+    def build_changes(self, request, queryset, check, label, describe=None):
+        """Return the changes of a collection since the ```since``` token.
+
+        These are the entities in ```queryset``` that pass ```check``` and
+        were created, modified or linked since then, the primary keys that
+        were deleted from the collection ```label``` and are not in it
+        again, and the token for the next request. An empty token returns
+        all entities.
+        """
+        if not self.track_changes:
+            raise PermissionDenied('The changes of this collection are not '
+                    'tracked.')
+        model = queryset.model
+        field = self.get_last_modified_field(model)
+        if field is None:
+            raise ValueError('%s has no last modified field.' % (
+                model.__name__,))
+        from .models import Tombstone
+
+        now = timezone.now()
+        queryset = queryset.all()
+        deleted = set()
+        token = request.GET.get('since')
+        if token:
+            since = self.decode_change_token(token)
+            if since < now - self.change_retention:
+                return HttpResponseGone()
+            queryset = queryset.filter(**{'%s__gte' % (field,): since})
+            pks = Tombstone.objects.filter(collection=label,
+                    deleted__gte=since).values_list('entity_pk', flat=True)
+            deleted = set(model._meta.pk.to_python(pk) for pk in pks)
+
+        results = []
+        for entity in self.prefetch_queryset(request, queryset):
+            # An entity that was removed and added again is in the
+            # collection now.
+            deleted.discard(entity.pk)
+            if check is None or check(entity):
+                results.append(entity if describe is None
+                        else describe(entity))
+        return {'results': results, 'deleted': list(deleted),
+                'token': self.encode_change_token(now)}
+
+    def get_collection_changes(self, request):
+        """Return the changes of the collection."""
+        queryset, check = self.get_collection_queryset(request)
+        return self.build_changes(request, queryset, check,
+                self.get_change_label(queryset.model))
+
+    def get_linked_collection_changes(self, request, instance_pk_or_entity,
+            link):
+        """Return the changes of the linked collection.
+
+        Links that are added through this view mark the linked entities as
+        modified, see ```record_links```.
+        """
+        entity = self.get_entity(request, instance_pk_or_entity)
+        queryset, check = self.get_linked_collection_queryset(request,
+                entity, link)
+        return self.build_changes(request, queryset, check,
+                self.get_change_label(entity, link),
+                lambda linked_entity: self.describe_linked_entity(request,
+                    entity, link, linked_entity))
+
+    def count_response(self, request, count, body=True):
+        """Return a HttpResponse with the number of entities ```count```."""
+        if body:
+            response = HttpResponse(
+                self.get_json_codec().encode({'count': count}),
+                content_type='application/json')
+        else:
+            response = HttpResponse(content_type='application/json')
+        response['X-Total-Count'] = str(count)
+        return response
+
     def get_collection(self, request):
         """Return a collection of entities."""
-        base_queryset = self.get_model(request).objects
-        queryset = self.filter_queryset(request, base_queryset)
-        return filter(lambda entity: self.can_get_entity(request, entity),
-                set(queryset.all()))
+        queryset, check = self.get_collection_queryset(request)
+        return self.build_collection(request, queryset, check)
 
     def get_linked_collection(self, request, instance_pk_or_entity, link):
         """Return a collection of linked entities by linked name."""
         entity = self.get_entity(request, instance_pk_or_entity)
-        base_queryset = self.get_linked_queryset(request, entity, link)
-        queryset = self.filter_queryset(request, base_queryset)
-        return [
-                self.describe_linked_entity(request, entity, link,
-                    linked_entity)
-                for linked_entity in filter(
-                    (lambda linked_entity: self.can_get_linked_entity(
-                        request, entity, link, linked_entity)),
-                    set(queryset.all()))]
+        queryset, check = self.get_linked_collection_queryset(request,
+                entity, link)
+        return self.build_collection(request, queryset, check,
+                lambda linked_entity: self.describe_linked_entity(request,
+                    entity, link, linked_entity))
+
+    def get_identity_map(self, request):
+        """Return the entities that were retrieved during ```request```."""
+        try:
+            return request.restapi_identity_map
+        except AttributeError:
+            request.restapi_identity_map = {}
+            return request.restapi_identity_map
+
+    def get_identity_key(self, request, model, pk, context=()):
+        """Return the key of an entity in the identity map.
+
+        The key includes the query string, since it filters the entities
+        that can be retrieved, the ```context``` of a linked entity and the
+        database it is read from, so a write never saves an entity that was
+        read from ```read_database```.
+        """
+        return (model, six.text_type(pk), request.GET.urlencode(), context,
+                self.get_read_database(request))
+
+    def forget_entities(self, request, model, pks=None):
+        """Remove the entities of ```model``` with primary keys ```pks```, or
+        all entities of ```model``` if ```pks``` is None, from the identity
+        map."""
+        if pks is not None:
+            pks = set(six.text_type(pk) for pk in pks)
+        identity_map = self.get_identity_map(request)
+        for key in list(identity_map):
+            if key[0] is model and (pks is None or key[1] in pks):
+                del identity_map[key]
 
     def get_entity(self, request, instance_pk_or_entity):
-        """Return the entity identified by instance_pk."""
-        if isinstance(instance_pk_or_entity, self.get_model(request)):
+        """Return the entity identified by instance_pk.
+
+        Entities are kept in the identity map of the request, so retrieving
+        the same entity again does not query the database.
+        """
+        model = self.get_model(request)
+        if isinstance(instance_pk_or_entity, model):
             entity = instance_pk_or_entity
         else:
-            base_queryset = self.get_model(request).objects
+            identity_map = self.get_identity_map(request)
+            key = self.get_identity_key(request, model, instance_pk_or_entity)
+            if key in identity_map:
+                return identity_map[key]
+
+            base_queryset = self.use_read_database(request, model.objects)
             queryset = self.filter_queryset(request, base_queryset)
+            restricted_queryset = self.restrict_queryset(request, queryset)
+            if restricted_queryset is not None:
+                queryset = restricted_queryset
             try:
                 entity = queryset.get(pk=instance_pk_or_entity)
             except queryset.model.DoesNotExist:
@@ -225,8 +1210,19 @@ class RESTView(View):
             except ValueError:
                 raise TypeError('Invalid primary key value for %s instance: %s' % (
                     queryset.model.__name__, instance_pk_or_entity))
+            timing = getattr(request, 'restapi_timing', None)
+            if timing is not None:
+                timing.rows += 1
+            with self.timed(request, 'permissions'):
+                allowed = self.can_get_entity(request, entity)
+            if not allowed:
+                raise PermissionDenied()
+            identity_map[key] = entity
+            return entity
 
-        if self.can_get_entity(request, entity):
+        with self.timed(request, 'permissions'):
+            allowed = self.can_get_entity(request, entity)
+        if allowed:
             return entity
         else:
             raise PermissionDenied()
@@ -235,8 +1231,19 @@ class RESTView(View):
             linked_instance_pk):
         """Return the linked entity identified by linked_instance_pk."""
         entity = self.get_entity(request, instance_pk_or_entity)
-        base_queryset = self.get_linked_queryset(request, entity, link)
+        base_queryset = self.use_read_database(request,
+                self.get_linked_queryset(request, entity, link))
+        identity_map = self.get_identity_map(request)
+        key = self.get_identity_key(request, base_queryset.model,
+                linked_instance_pk, (entity.__class__, entity.pk, link))
+        if key in identity_map:
+            return identity_map[key]
+
         queryset = self.filter_queryset(request, base_queryset)
+        restricted_queryset = self.restrict_linked_queryset(request, entity,
+                link, queryset)
+        if restricted_queryset is not None:
+            queryset = restricted_queryset
         try:
             linked_entity = queryset.get(pk=linked_instance_pk)
         except queryset.model.DoesNotExist:
@@ -248,6 +1255,7 @@ class RESTView(View):
         else:
             if self.can_get_linked_entity(request, entity, link,
                     linked_entity):
+                identity_map[key] = linked_entity
                 return linked_entity
             else:
                 raise PermissionDenied()
@@ -265,11 +1273,18 @@ class RESTView(View):
         fields = self.get_model_form_fields(request)
 
         if desired_fields is not None:
-            fields = filter(lambda x: x.name in desired_fields, fields)
+            desired_fields = set(desired_fields)
+            fields = [field for field in fields
+                    if field.name in desired_fields]
 
         if fields:
-            field_names = map(lambda x: x.name, fields)
-            return modelform_factory(model, fields=field_names)
+            field_names = [field.name for field in fields]
+            key = (model, frozenset(field_names))
+            FormCls = RESTView.model_forms.get(key)
+            if FormCls is None:
+                FormCls = modelform_factory(model, fields=field_names)
+                RESTView.model_forms.set(key, FormCls)
+            return FormCls
         else:
             return None
 
@@ -290,8 +1305,55 @@ class RESTView(View):
         except ValueError as e:
             return HttpResponseBadRequest(str(e))
         else:
+            self.entities_changed(request, entity.__class__)
             return entity
 
+    def create_entities(self, request, data):
+        """Create an entity for every dictionary in the list ```data```.
+
+        Every item is validated on its own and the valid ones are inserted
+        with ```bulk_create``` in one transaction, in batches of
+        ```bulk_create_batch_size```. Model ```save``` methods are not called.
+        Return a list with for every item either the created entity or the
+        errors that prevented its creation. Only some databases return the
+        primary keys of a bulk insert, e.g. PostgreSQL from Django 1.10 on.
+        Elsewhere the created entities have no primary key and their items
+        have ```pk_unknown``` set.
+        """
+        FormCls = self.get_model_form(request)
+        if FormCls is None:
+            raise PermissionDenied()
+
+        results = []
+        entities = []
+        for item in data:
+            if not isinstance(item, dict):
+                errors = {'__all__': ['Item should be a dictionary.']}
+            elif not self.can_create_entity(request, item):
+                errors = {'__all__': ['Permission denied.']}
+            else:
+                form = FormCls(item)
+                if form.is_valid():
+                    entity = form.save(commit=False)
+                    entities.append(entity)
+                    results.append({'entity': entity})
+                    continue
+                errors = dict((field, [six.text_type(error)
+                    for error in field_errors])
+                    for field, field_errors in form.errors.items())
+            results.append({'errors': errors})
+
+        if entities:
+            model = self.get_model(request)
+            with transaction.atomic():
+                model.objects.bulk_create(entities,
+                        batch_size=self.bulk_create_batch_size)
+            for result in results:
+                if 'entity' in result and result['entity'].pk is None:
+                    result['pk_unknown'] = True
+            self.entities_changed(request, model)
+        return results
+
     def create_linked_entity(self, request, instance_pk_or_entity, link,
             data):
         """Add the entity ``linked_instance_pk``` to the linked collection."""
@@ -307,16 +1369,95 @@ class RESTView(View):
             if not isinstance(data, dict):
                 raise ValueError('POST data should contain dictionary')
             else:
-                linked_entity = get_object_or_404(linked_model, **data)
+                try:
+                    linked_entity = linked_model.objects.get(**data)
+                except linked_model.DoesNotExist:
+                    raise LinkedEntityDoesNotExist(
+                            'There is no %s instance matching: %s' % (
+                                linked_model.__name__, data))
                 if not self.can_create_linked_entity(request, entity,
                         link, linked_entity):
                     raise PermissionDenied()
 
                 queryset.add(linked_entity)
-                entity.save()
+                self.record_links(request, entity, [linked_entity])
+                self.entities_changed(request, entity.__class__)
+                self.entities_changed(request, linked_model)
+
+    def resolve_linked_entities(self, request, queryset, items):
+        """Return the entities in ```queryset``` specified by ```items```.
+
+        Every item is either a primary key or a dictionary of key-value
+        pairs that matches exactly one entity. The primary keys are resolved
+        with a single query. A HTTP 404 is returned when an item cannot be
+        found and a HTTP 400 when a dictionary is empty or matches several
+        entities.
+        """
+        if not isinstance(items, list):
+            raise ValueError('Payload should contain a list')
+
+        model = queryset.model
+        pks = []
+        linked_entities = []
+        for item in items:
+            if not isinstance(item, dict):
+                pks.append(item)
+                continue
+            if not item:
+                raise ValueError('An item should contain key-value pairs.')
+            try:
+                linked_entities.append(queryset.get(**item))
+            except model.DoesNotExist:
+                raise LinkedEntityDoesNotExist(
+                        'There is no %s instance matching: %s' % (
+                            model.__name__, item))
+            except model.MultipleObjectsReturned:
+                raise ValueError('Several %s instances match: %s' % (
+                    model.__name__, item))
+
+        if pks:
+            found = dict((six.text_type(entity.pk), entity)
+                    for entity in queryset.filter(pk__in=pks))
+            requested = set(six.text_type(model._meta.pk.to_python(pk))
+                    for pk in pks)
+            missing = requested - set(found)
+            if missing:
+                raise LinkedEntityDoesNotExist('There are no %s instances '
+                        'with primary keys: %s' % (model.__name__,
+                            ', '.join(sorted(missing))))
+            linked_entities.extend(found.values())
+
+        unique = {}
+        for linked_entity in linked_entities:
+            unique[linked_entity.pk] = linked_entity
+        return list(unique.values())
+
+    def create_linked_entities(self, request, instance_pk_or_entity, link,
+            data):
+        """Add the entities specified by the list ```data``` to the linked
+        collection."""
+        entity = self.get_entity(request, instance_pk_or_entity)
+        linked_model = self.get_linked_model(request, link)
+        queryset = self.get_linked_queryset(request, entity, link)
+        linked_entities = self.resolve_linked_entities(request,
+                linked_model.objects, data)
+
+        if not self.can_create_linked_entities(request, entity, link,
+                linked_entities):
+            raise PermissionDenied()
+
+        if linked_entities:
+            queryset.add(*linked_entities)
+            self.record_links(request, entity, linked_entities)
+            self.entities_changed(request, entity.__class__)
+            self.entities_changed(request, linked_model)
 
     def edit_entity(self, request, instance_pk, data):
-        """Create an entity using ```data```."""
+        """Create an entity using ```data```.
+
+        If the entity is not saved, it is removed from the identity map,
+        since the form has already changed it.
+        """
         if not isinstance(data, dict):
             raise ValueError('PUT data should contain dictionary')
 
@@ -333,10 +1474,153 @@ class RESTView(View):
         try:
             entity = form.save()
         except ValueError as e:
+            self.forget_entities(request, entity.__class__, [entity.pk])
             return HttpResponseBadRequest(str(e))
+        except Exception:
+            self.forget_entities(request, entity.__class__, [entity.pk])
+            raise
         else:
+            self.entities_changed(request, entity.__class__)
             return entity
 
+    def get_patch_form(self, request, data, instance):
+        """Return a ModelForm for the fields in ```data``` bound to
+        ```instance```."""
+        if not isinstance(data, dict):
+            raise ValueError('PATCH data should contain dictionary')
+        FormCls = self.get_model_form(request, data.keys())
+        if FormCls is None:
+            raise PermissionDenied()
+        return FormCls(data, instance=instance)
+
+    def get_update_fields(self, form):
+        """Return the names of the fields that a valid ```form``` changes,
+        including the fields that are set whenever an entity is saved."""
+        fields = list(form._meta.fields)
+        for field in form.instance._meta.fields:
+            if getattr(field, 'auto_now', False) and field.name not in fields:
+                fields.append(field.name)
+        return fields
+
+    def get_update_values(self, form):
+        """Return the values of the fields that a valid ```form``` changes."""
+        entity = form.instance
+        values = {}
+        for name in self.get_update_fields(form):
+            field = entity._meta.get_field(name)
+            if getattr(field, 'auto_now', False):
+                values[name] = field.pre_save(entity, False)
+            else:
+                values[name] = getattr(entity, name)
+        return values
+
+    def can_update_blindly(self, model, data):
+        """Return if the fields in ```data``` can be validated without
+        loading the entity, which holds when none of them is unique and
+        ```model``` has no ```clean``` method of its own."""
+        from django.db.models import Model
+        if model.clean != Model.clean:
+            return False
+        names = set(data)
+        for field in model._meta.fields:
+            if field.name in names and field.unique:
+                return False
+        for unique_together in model._meta.unique_together:
+            if names & set(unique_together):
+                return False
+        return True
+
+    def patch_entity(self, request, instance_pk_or_entity, data):
+        """Change the fields of an entity that are in ```data```.
+
+        Only these fields are validated and written, and nothing is
+        returned. If neither ```can_get_entity``` nor ```can_edit_entity```
+        is overridden and ```can_update_blindly``` holds, they are written
+        with a single UPDATE of the filtered and restricted queryset without
+        loading the entity. Model ```save```
+        methods and signals are then not called. Otherwise the entity is
+        saved with ```update_fields```, and removed from the identity map if
+        that fails.
+        """
+        model = self.get_model(request)
+        if (not isinstance(instance_pk_or_entity, model)
+                and isinstance(data, dict)
+                and not self.overrides('can_get_entity')
+                and not self.overrides('can_edit_entity')
+                and self.can_update_blindly(model, data)):
+            form = self.get_patch_form(request, data,
+                    model(pk=instance_pk_or_entity))
+            if not form.is_valid():
+                return HttpResponseBadRequest(form.errors.as_text())
+            queryset = self.filter_queryset(request, model.objects)
+            restricted_queryset = self.restrict_queryset(request, queryset)
+            if restricted_queryset is not None:
+                queryset = restricted_queryset
+            try:
+                updated = queryset.filter(pk=instance_pk_or_entity).update(
+                        **self.get_update_values(form))
+            except ValueError:
+                updated = 0
+            if not updated:
+                raise TypeError('There is no %s instance with primary key: %s' % (
+                    model.__name__, instance_pk_or_entity))
+            self.forget_entities(request, model, [instance_pk_or_entity])
+            self.entities_changed(request, model)
+            return None
+
+        entity = self.get_entity(request, instance_pk_or_entity)
+        if not self.can_edit_entity(request, entity):
+            raise PermissionDenied()
+
+        form = self.get_patch_form(request, data, entity)
+        if not form.is_valid():
+            self.forget_entities(request, model, [entity.pk])
+            return HttpResponseBadRequest(form.errors.as_text())
+        try:
+            entity = form.save(commit=False)
+            entity.save(update_fields=self.get_update_fields(form))
+        except Exception:
+            self.forget_entities(request, model, [entity.pk])
+            raise
+        self.entities_changed(request, model)
+        return None
+
+    def patch_entities(self, request, data):
+        """Change the fields in ```data``` of every entity in the filtered
+        collection and return the number of changed entities.
+
+        The entities are changed with a single UPDATE of the filtered
+        queryset, unless each of them must pass ```can_edit_entity```. Then
+        the entities that pass are updated by primary key, in batches of
+        ```bulk_create_batch_size```. Model ```save``` methods and signals
+        are not called. The request must have at least one filter, so a
+        PATCH cannot change the whole table by accident.
+        """
+        model = self.get_model(request)
+        plan = self.get_filter_plan(model)
+        if not any(param.partition('__')[0] in plan for param in request.GET):
+            raise ValueError('A PATCH of the collection needs a filter.')
+        form = self.get_patch_form(request, data, model())
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text())
+        values = self.get_update_values(form)
+
+        queryset, check = self.get_collection_queryset(request)
+        with transaction.atomic():
+            if check is None and not self.overrides('can_edit_entity'):
+                updated = queryset.update(**values)
+            else:
+                pks = [entity.pk for entity in queryset.all().iterator()
+                        if self.can_edit_entity(request, entity)]
+                updated = 0
+                size = self.bulk_create_batch_size
+                for start in range(0, len(pks), size):
+                    updated += model.objects.filter(
+                            pk__in=pks[start:start + size]).update(**values)
+        self.forget_entities(request, model)
+        self.entities_changed(request, model)
+        return {'count': updated}
+
     def delete_entity(self, request, instance_pk):
         """Delete an entity."""
 
@@ -345,7 +1629,12 @@ class RESTView(View):
         if not self.can_delete_entity(request, entity):
             raise PermissionDenied()
 
+        pk = entity.pk
         entity.delete()
+        self.forget_entities(request, entity.__class__, [pk])
+        self.record_deletions(request, self.get_change_label(entity.__class__),
+                [pk])
+        self.entities_changed(request, entity.__class__)
 
     def delete_linked_entity(self, request, instance_pk, link,
             linked_instance_pk):
@@ -361,6 +1650,32 @@ class RESTView(View):
 
         queryset = self.get_linked_queryset(request, entity, link)
         queryset.remove(linked_entity)
+        self.forget_entities(request, linked_entity.__class__,
+                [linked_entity.pk])
+        self.record_deletions(request, self.get_change_label(entity, link),
+                [linked_entity.pk])
+        self.entities_changed(request, entity.__class__)
+        self.entities_changed(request, linked_entity.__class__)
+
+    def delete_linked_entities(self, request, instance_pk, link, data):
+        """Delete the linked entities specified by the list ```data```."""
+        entity = self.get_entity(request, instance_pk)
+        queryset = self.get_linked_queryset(request, entity, link)
+        linked_entities = self.resolve_linked_entities(request, queryset,
+                data)
+
+        if not self.can_delete_linked_entities(request, entity, link,
+                linked_entities):
+            raise PermissionDenied()
+
+        if linked_entities:
+            queryset.remove(*linked_entities)
+            pks = [linked_entity.pk for linked_entity in linked_entities]
+            self.forget_entities(request, queryset.model, pks)
+            self.record_deletions(request, self.get_change_label(entity, link),
+                    pks)
+            self.entities_changed(request, entity.__class__)
+            self.entities_changed(request, queryset.model)
 
     def call_collection_method(self, request, method, data):
         """Return the output of the collection method ```method```."""
@@ -369,10 +1684,12 @@ class RESTView(View):
         if callable(collection_method):
             if type(collection_method) == type(lambda x: x):
                 # Static method
-                return collection_method(request, data)
+                return self.call_method(request, collection_method, model,
+                        None, data)
             elif collection_method.im_self is not None:
                 # Bound method
-                return collection_method(request, data)
+                return self.call_method(request, collection_method, model,
+                        None, data)
             else:
                 # Unbound method
                 raise TypeError('Unbound methods are not allowed.')
@@ -390,7 +1707,8 @@ class RESTView(View):
                 raise TypeError('Static methods are not allowed.')
             elif entity_method.im_self is not None:
                 # Bound method
-                return entity_method(request, data)
+                return self.call_method(request, entity_method,
+                        entity.__class__, entity.pk, data)
             else:
                 # Unbound method
                 raise TypeError('Unbound methods are not allowed.')
@@ -398,6 +1716,37 @@ class RESTView(View):
             raise TypeError('`%s.%s` is not a callable.' % (
                 entity.__class__.__name__, method,))
 
+    def call_method(self, request, method, model, pk, data):
+        """Return the output of the model ```method``` for ```data```.
+
+        The output of a method that is declared ```cacheable``` is kept in
+        ```method_results``` for its ttl, by ```model```, method name,
+        entity primary key ```pk```, ```data``` and ```get_cache_vary```.
+        Writes to ```model``` through a RESTView in any process replace it,
+        by incrementing its counter in ```method_generations```.
+        The output is kept in its serialized form, so querysets are not run
+        again. Iterators and responses are not cached.
+        """
+        ttl = getattr(method, 'cache_ttl', None)
+        if ttl is None:
+            return method(request, data)
+
+        key = (model, method.__name__, pk,
+                json.dumps(data, sort_keys=True, separators=(',', ':')),
+                RESTView.method_generations.get_generations([model])[0],
+                self.get_cache_vary(request))
+        now = time.time()
+        entry = RESTView.method_results.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        result = method(request, data)
+        if isinstance(result, (HttpResponse, types.GeneratorType)) or \
+                (hasattr(result, '__iter__') and iter(result) is result):
+            return result
+        result = self.serialize_for_json(request, result)
+        RESTView.method_results.set(key, (now + ttl, result))
+        return result
+
     def call_linked_collection_method(self, request, entity, link,
             method, data):
         return HttpResponse("%s(%s)" % (method, str(data)))
@@ -406,48 +1755,190 @@ class RESTView(View):
             linked_entity, method, data):
         return HttpResponse("%s(%s)" % (method, str(data)))
 
-    def serialize_for_json(self, request, response):
-        """Return a JSON-serializable representation of the response."""
-        # Test if response is already serializable. If so, keep it as is
-        try:
-            json.dumps(response)
-        except TypeError as e:
-            pass
-        else:
-            return response
-
-        # If response is a dictionary, serialize its values
-        if isinstance(response, dict):
-            for key in response:
-                response[key] = self.serialize_for_json(request, response[key])
-            return response
-
-        # If response is a Django Model, try to delegate to its API view.
-        if isinstance(response, Model):
-            View = RESTAPI.get_view_by_model(response.__class__)
-            if View is not None:
-                return self.serialize_for_json(request,
-                        View().describe_entity(request, response))
+    def serialize_for_json(self, request, response, fields=None):
+        """Return a JSON-serializable representation of the response.
 
-        # Try serializing it as an iterable object
-        try:
-            it = iter(response)
-        except TypeError:
-            pass
+        If ```fields``` is given, ```response``` is an entity or its
+        description and only the keys in ```fields``` are kept.
+        """
+        if fields is None:
+            return JSONSerializer(request).serialize(response)
         else:
-            return [self.serialize_for_json(request, elem) for elem in it]
-
-        # Try serializing it as an object with a describe function
-        if callable(getattr(response, 'describe', None)):
-            response = self.serialize_for_json(request, response.describe())
-
-        # Test the serialization again, if it fails cast it to a string
-        try:
-            json.dumps(response)
-        except TypeError as e:
-            return str(response)
+            return JSONSerializer(request).serialize_fields(response, fields)
+
+    def get_last_modified_field(self, model):
+        """Return the name of the field that holds the time an entity of
+        ```model``` was last modified, or None."""
+        if self.last_modified_field is not None:
+            return self.last_modified_field
+        for field in model._meta.fields:
+            if isinstance(field, DateTimeField) and field.auto_now:
+                return field.name
+        return None
+
+    def make_etag(self, *parts):
+        """Return an ETag that identifies ```parts```."""
+        return hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+
+    def get_content_etag(self, content):
+        """Return the ETag of a response body."""
+        return hashlib.md5(content).hexdigest()
+
+    def get_entity_validators(self, request, entity):
+        """Return the ETag and modification time of ```entity```.
+
+        Both are None if the model has no modification time; the ETag is
+        then computed from the response body.
+        """
+        field = self.get_last_modified_field(entity.__class__)
+        modified = None if field is None else getattr(entity, field)
+        if modified is None:
+            return None, None
+        return self.make_etag(entity.__class__.__name__, entity.pk,
+                modified.isoformat(), request.GET.get('fields')), modified
+
+    def get_collection_validators(self, request, queryset):
+        """Return the ETag and modification time of the collection in
+        ```queryset```, computed with a single aggregate query.
+
+        Both are None if the model has no modification time; the ETag is
+        then computed from the response body.
+        """
+        field = self.get_last_modified_field(queryset.model)
+        if field is None:
+            return None, None
+        stats = queryset.aggregate(modified=Max(field), count=Count('pk'))
+        modified = stats['modified']
+        return self.make_etag(request.get_full_path(), stats['count'],
+                modified and modified.isoformat()), modified
+
+    def get_linked_collection_validators(self, request, entity, link,
+            queryset):
+        """Return the ETag and modification time of the linked collection
+        in ```queryset```.
+
+        Adding and removing links changes neither model's modification time,
+        so the ETag also contains the newest row of the through table of
+        ```link```, which every new link replaces. Both are None if the
+        linked queryset is not a plain many2many field.
+        """
+        etag, modified = self.get_collection_validators(request, queryset)
+        if etag is None or self.overrides('get_linked_queryset'):
+            return None, None
+        field, _m, direct, _m2m = entity._meta.get_field_by_name(link)
+        if direct:
+            name = field.m2m_field_name()
         else:
+            field = field.field
+            name = field.m2m_reverse_field_name()
+        through = self.use_read_database(request, field.rel.through.objects)
+        newest = through.filter(**{name: entity.pk}).aggregate(
+                newest=Max('pk'))['newest']
+        return self.make_etag(etag, newest), modified
+
+    def get_entity_etag(self, request, entity):
+        """Return the ETag that a GET of ```entity``` returns."""
+        etag = self.get_entity_validators(request, entity)[0]
+        if etag is None:
+            etag = self.get_content_etag(self.get_json_codec().encode(
+                self.serialize_for_json(request, entity)))
+        return etag
+
+    def is_not_modified(self, request, etag, last_modified):
+        """Return if the client already has the representation identified
+        by ```etag``` and ```last_modified```."""
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            if etag is None:
+                return False
+            return if_none_match.strip() == '*' or quote_etag(etag) in [
+                    quote_etag(tag) for tag in parse_etags(if_none_match)]
+        if_modified_since = parse_http_date_safe(
+                request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        if if_modified_since is not None and last_modified is not None:
+            return (calendar.timegm(last_modified.utctimetuple())
+                    <= if_modified_since)
+        return False
+
+    def is_precondition_failed(self, request, entity):
+        """Return if the ```If-Match``` header does not match ```entity```."""
+        if_match = request.META.get('HTTP_IF_MATCH')
+        if not if_match or if_match.strip() == '*':
+            return False
+        etag = quote_etag(self.get_entity_etag(request, entity))
+        return etag not in [quote_etag(tag) for tag in parse_etags(if_match)]
+
+    def set_validators(self, response, etag, last_modified):
+        """Set the ETag and Last-Modified headers of ```response```."""
+        if etag is not None:
+            response['ETag'] = quote_etag(etag)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(
+                    calendar.timegm(last_modified.utctimetuple()))
+        return response
+
+    def conditional_response(self, request, response, etag, last_modified):
+        """Add the validators to ```response```, or return a HTTP 304 if the
+        client is up to date.
+
+        A streamed response only gets the validators that were computed
+        before it, since its content is not known up front.
+        """
+        if response.status_code != 200:
             return response
+        if response.streaming:
+            return self.set_validators(response, etag, last_modified)
+        if etag is None:
+            etag = self.get_content_etag(response.content)
+            if self.is_not_modified(request, etag, None):
+                response = HttpResponseNotModified()
+        return self.set_validators(response, etag, last_modified)
+
+    def get_cache_models(self, request, *args):
+        """Return the models whose changes invalidate the cached response to
+        a GET request with ```args```."""
+        models = [self.get_model(request)]
+        if len(args) >= 2:
+            try:
+                models.append(self.get_linked_model(request, args[1]))
+            except TypeError:
+                pass
+        return models
+
+    def get_cache_vary(self, request):
+        """Return the value, besides the URL, that a cached response depends
+        on. This is the primary key of the user by default."""
+        return getattr(getattr(request, 'user', None), 'pk', None)
+
+    def cached_response(self, request, response):
+        """Return the cached ```response```, or a HTTP 304 if the client is
+        up to date."""
+        etag = last_modified = None
+        if response.has_header('ETag'):
+            etag = parse_etags(response['ETag'])[0]
+        if response.has_header('Last-Modified'):
+            timestamp = parse_http_date_safe(response['Last-Modified'])
+            if timestamp is not None:
+                last_modified = datetime.datetime.utcfromtimestamp(timestamp)
+        if self.is_not_modified(request, etag, last_modified):
+            return self.set_validators(HttpResponseNotModified(), etag,
+                    last_modified)
+        return response
+
+    def get_json_codec(self):
+        """Return the codec of request and response bodies."""
+        if self.json_codec is not None:
+            return self.json_codec
+        return RESTAPI.json_codec
+
+    def stream_json(self, request, reply):
+        """Yield the JSON array of the serialized elements of ```reply```."""
+        encode = self.get_json_codec().encode
+        separator = b'['
+        for elem in reply:
+            yield separator + encode(self.serialize_for_json(request, elem))
+            separator = b','
+        yield b'[]' if separator == b'[' else b']'
 
     def reply_to_response(self, request, reply):
         """Return a HttpResponse object containing the ```reply```."""
@@ -455,33 +1946,180 @@ class RESTView(View):
             return HttpResponse(status=204)
         elif isinstance(reply, HttpResponse):
             return reply
-        else:
-            serialized_reply = self.serialize_for_json(request, reply)
-            return HttpResponse(json.dumps(serialized_reply),
+        elif isinstance(reply, types.GeneratorType):
+            return StreamingHttpResponse(self.stream_json(request, reply),
                 content_type='application/json')
+        else:
+            with self.timed(request, 'serialize'):
+                serialized_reply = self.serialize_for_json(request, reply)
+            with self.timed(request, 'encode'):
+                content = self.get_json_codec().encode(serialized_reply)
+            return HttpResponse(content, content_type='application/json')
+
+    def timed(self, request, phase):
+        """Return a context manager that adds its duration to ```phase```
+        of the request timing, if the request is instrumented."""
+        timing = getattr(request, 'restapi_timing', None)
+        if timing is None:
+            return NULL_TIMING
+        return timing.phase(phase)
+
+    def finish_timing(self, request, response, timing):
+        """Add the ```timing``` of ```request``` to ```response``` and send
+        the ```request_timed``` signal."""
+        timing.finish()
+        response['Server-Timing'] = timing.header()
+        request_timed.send(sender=type(self), request=request,
+                response=response, timing=timing)
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        """Dispatch the request, timing it if ```instrument``` is set.
+
+        Queries are counted with the debug cursor of each connection, which
+        is only enabled during instrumented requests. Streamed bodies are
+        serialized after the request is timed.
+        """
+        if not self.instrument:
+            return self.set_sticky_cookie(request, super(RESTView,
+                self).dispatch(request, *args, **kwargs))
+        timing = request.restapi_timing = Timing()
+        timing.start_queries()
+        try:
+            response = super(RESTView, self).dispatch(request, *args,
+                    **kwargs)
+        finally:
+            timing.stop_queries()
+        return self.finish_timing(request,
+                self.set_sticky_cookie(request, response), timing)
 
     def get(self, request, *args):
         """Handle GET request."""
         cargs = len(args)
 
         try:
+            cache_key = None
+            if self.response_cache is not None:
+                cache_key = self.response_cache.get_key(request,
+                        self.get_cache_models(request, *args),
+                        self.get_cache_vary(request))
+                response = self.response_cache.get(cache_key)
+                if response is not None:
+                    return self.cached_response(request, response)
+
+            if cargs in (0, 2) and request.GET.get('count') == 'only':
+                # URL: /?count=only or /entity/collection/?count=only
+                if cargs == 0:
+                    count = self.get_collection_count(request)
+                else:
+                    count = self.get_linked_collection_count(request,
+                            args[0], args[1])
+                return self.count_response(request, count)
+
+            if cargs in (0, 2) and 'since' in request.GET:
+                # URL: /?since= or /entity/collection/?since=
+                if cargs == 0:
+                    reply = self.get_collection_changes(request)
+                else:
+                    reply = self.get_linked_collection_changes(request,
+                            args[0], args[1])
+                return self.reply_to_response(request, reply)
+
+            if cargs in (0, 2) and request.GET.get('aggregate'):
+                # URL: /?aggregate= or /entity/collection/?aggregate=
+                if cargs == 0:
+                    reply = self.get_collection_aggregates(request)
+                else:
+                    reply = self.get_linked_collection_aggregates(request,
+                            args[0], args[1])
+                response = self.reply_to_response(request, reply)
+                if cache_key is not None:
+                    self.response_cache.set(cache_key, response)
+                return response
+
             if cargs == 0:
                 # URL: /
+                etag, last_modified = self.get_collection_validators(request,
+                        self.get_collection_queryset(request)[0])
+                if self.is_not_modified(request, etag, last_modified):
+                    return self.set_validators(HttpResponseNotModified(),
+                            etag, last_modified)
                 reply = self.get_collection(request)
             elif cargs == 1:
                 # URL: /entity
                 reply = self.get_entity(request, args[0])
+                etag, last_modified = self.get_entity_validators(request,
+                        reply)
             elif cargs == 2:
                 # URL: /entity/collection/
-                reply = self.get_linked_collection(request, args[0], args[1])
+                entity = self.get_entity(request, args[0])
+                etag, last_modified = self.get_linked_collection_validators(
+                        request, entity, args[1],
+                        self.get_linked_collection_queryset(
+                            request, entity, args[1])[0])
+                if self.is_not_modified(request, etag, last_modified):
+                    return self.set_validators(HttpResponseNotModified(),
+                            etag, last_modified)
+                reply = self.get_linked_collection(request, entity, args[1])
             elif cargs == 3:
                 # URL: /entity/collection/entity
                 reply = self.get_linked_entity(
                         request, args[0], args[1], args[2])
+                etag, last_modified = self.get_entity_validators(request,
+                        reply)
             else:
                 raise Http404
 
-            return self.reply_to_response(request, reply)
+            if self.is_not_modified(request, etag, last_modified):
+                return self.set_validators(HttpResponseNotModified(),
+                        etag, last_modified)
+
+            fields = self.get_sparse_fields(request)
+            if fields is not None and cargs in (1, 3):
+                reply = self.serialize_for_json(request, reply, fields)
+
+            response = self.conditional_response(request,
+                    self.reply_to_response(request, reply),
+                    etag, last_modified)
+            if cache_key is not None and response.status_code == 200 \
+                    and not response.streaming:
+                self.response_cache.set(cache_key, response)
+            return response
+
+        except PermissionDenied as e:
+            if settings.DEBUG:
+                return HttpResponseForbidden(str(e))
+            else:
+                return HttpResponseForbidden()
+
+        except TypeError as e:
+            if settings.DEBUG:
+                raise Http404(str(e))
+            else:
+                raise Http404()
+
+        except Exception as e:
+            if settings.DEBUG:
+                return HttpResponseBadRequest(str(e))
+            else:
+                return HttpResponseBadRequest()
+
+    def head(self, request, *args):
+        """Handle HEAD request."""
+        cargs = len(args)
+
+        try:
+            if cargs == 0:
+                # URL: /
+                count = self.get_collection_count(request)
+            elif cargs == 2:
+                # URL: /entity/collection/
+                count = self.get_linked_collection_count(request, args[0],
+                        args[1])
+            else:
+                return self.get(request, *args)
+
+            return self.count_response(request, count, body=False)
 
         except PermissionDenied as e:
             if settings.DEBUG:
@@ -506,10 +2144,13 @@ class RESTView(View):
         cargs = len(args)
 
         try:
-            data = json.loads(request.body)
+            data = self.get_json_codec().decode(request.body)
             if cargs == 0:
                 # URL: /
-                reply = self.create_entity(request, data)
+                if isinstance(data, list):
+                    reply = self.create_entities(request, data)
+                else:
+                    reply = self.create_entity(request, data)
             elif cargs == 1:
                 # URL: /method
                 reply = self.call_collection_method(
@@ -517,8 +2158,14 @@ class RESTView(View):
             elif cargs == 2:
                 try:
                     # URL 1): /entity/collection/
-                    reply = self.create_linked_entity(
-                            request, args[0], args[1], data)
+                    if isinstance(data, list):
+                        reply = self.create_linked_entities(
+                                request, args[0], args[1], data)
+                    else:
+                        reply = self.create_linked_entity(
+                                request, args[0], args[1], data)
+                except LinkedEntityDoesNotExist:
+                    raise
                 except TypeError:
                     # URL 2): /entity/method/
                     reply = self.call_entity_method(
@@ -559,10 +2206,55 @@ class RESTView(View):
         cargs = len(args)
 
         try:
-            data = json.loads(request.body)
+            data = self.get_json_codec().decode(request.body)
             if cargs == 1:
                 # URL: /entity
-                reply = self.edit_entity(request, args[0], data)
+                entity = args[0]
+                if 'HTTP_IF_MATCH' in request.META:
+                    entity = self.get_entity(request, entity)
+                    if self.is_precondition_failed(request, entity):
+                        return HttpResponse(status=412)
+                reply = self.edit_entity(request, entity, data)
+            else:
+                raise TypeError()
+
+            return self.reply_to_response(request, reply)
+
+        except PermissionDenied as e:
+            if settings.DEBUG:
+                return HttpResponseForbidden(str(e))
+            else:
+                return HttpResponseForbidden()
+
+        except TypeError as e:
+            if settings.DEBUG:
+                raise Http404(str(e))
+            else:
+                raise Http404()
+
+        except Exception as e:
+            if settings.DEBUG:
+                return HttpResponseBadRequest(str(e))
+            else:
+                return HttpResponseBadRequest()
+
+    def patch(self, request, *args):
+        """Handle PATCH request."""
+        cargs = len(args)
+
+        try:
+            data = self.get_json_codec().decode(request.body)
+            if cargs == 0:
+                # URL: /
+                reply = self.patch_entities(request, data)
+            elif cargs == 1:
+                # URL: /entity
+                entity = args[0]
+                if 'HTTP_IF_MATCH' in request.META:
+                    entity = self.get_entity(request, entity)
+                    if self.is_precondition_failed(request, entity):
+                        return HttpResponse(status=412)
+                reply = self.patch_entity(request, entity, data)
             else:
                 raise TypeError()
 
@@ -594,6 +2286,11 @@ class RESTView(View):
             if cargs == 1:
                 # URL: /entity
                 reply = self.delete_entity(request, args[0])
+            elif cargs == 2:
+                # URL: /entity/collection/
+                data = self.get_json_codec().decode(request.body)
+                reply = self.delete_linked_entities(request, args[0], args[1],
+                        data)
             elif cargs == 3:
                 # URL: /entity/collection/linked_entity
                 reply = self.delete_linked_entity(request, args[0], args[1],